@@ -0,0 +1,119 @@
+// Client side solution browser for genetic-dash.py.
+// The solution-payload store holds every best solution of the session in compact form (see solution_payload),
+// moving solution-slider redraws the map and the truck loadouts from it without calling the server.
+// Stops are [package id, address, due, delivered, late], costs has the per truck and per late package costs.
+
+var TABLE_STYLE = {
+    style_table: {'overflowX': 'auto'},
+    style_cell: {'padding': '4px', 'textAlign': 'left', 'background-color': '#1e1e1e', 'color': '#f8f9fa', 'font-size': '10pt'},
+    style_header: {'backgroundColor': '#1e1e1e', 'fontWeight': 'bold', 'color': '#ffffff'},
+    page_size: 15
+};
+
+var TABLE_COLUMNS = [
+    {'name': 'Package', 'id': 'Package'},
+    {'name': 'Location', 'id': 'Location'},
+    {'name': 'Due', 'id': 'Due'},
+    {'name': 'Del', 'id': 'Delivered'},
+    {'name': 'Late?', 'id': 'Late?'}
+];
+
+function pickSolution(index, payload) {
+    if (!payload || !payload.solutions) {
+        return null;
+    }
+    var i = parseInt(index, 10);
+    if (isNaN(i) || i < 0 || i >= payload.solutions.length) {
+        return null;
+    }
+    return payload.solutions[i];
+}
+
+function html(type, children) {
+    return {'type': type, 'namespace': 'dash_html_components', 'props': {'children': children}};
+}
+
+// Cost breakdown the same way the run summary totals it: mileage of the active trucks + their truck cost + the
+// late package cost
+function solutionCost(solution, costs) {
+    var miles = 0;
+    var active = 0;
+    solution.trucks.forEach(function (truck) {
+        if (truck.stops.length) {
+            miles += truck.mileage;
+            active += 1;
+        }
+    });
+    return {'miles': miles, 'active': active, 'total': miles + active * costs.truck + solution.late * costs.late};
+}
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    solutionBrowser: {
+        // Base edges under the nodes without a solution, otherwise a line per active truck from the hub and back
+        map: function (index, payload, base) {
+            var solution = pickSolution(index, payload);
+            if (!solution) {
+                return {'data': [base.edges, base.nodes], 'layout': base.layout};
+            }
+            var lon = base.nodes.lon;
+            var lat = base.nodes.lat;
+            var data = [];
+            solution.trucks.forEach(function (truck, i) {
+                if (!truck.stops.length) {
+                    return;
+                }
+                var route = [0].concat(truck.stops.map(function (stop) { return stop[1]; }), [0]);
+                data.push({
+                    'type': 'scattermap',
+                    'lon': route.map(function (address) { return lon[address]; }),
+                    'lat': route.map(function (address) { return lat[address]; }),
+                    'mode': 'lines',
+                    'line': {'width': 2, 'color': base.colors[i % base.colors.length]},
+                    'name': 'Truck ' + (i + 1)
+                });
+            });
+            data.push(base.nodes);
+            return {'data': data, 'layout': base.layout};
+        },
+
+        loadout: function (index, payload) {
+            var solution = pickSolution(index, payload);
+            if (!solution) {
+                return 'Please hit Run to Generate new solution sets.';
+            }
+            var cost = solutionCost(solution, payload.costs);
+            var assignments = 'Truck Route Assignments:\n';
+            var tables = [];
+            solution.trucks.forEach(function (truck, i) {
+                assignments += 'Truck ' + (i + 1) + ': [' + truck.stops.map(function (stop) { return stop[0]; }).join(', ') + ']\n';
+                if (!truck.stops.length) {
+                    return;
+                }
+                var rows = truck.stops.map(function (stop) {
+                    return {
+                        'Package': stop[0],
+                        'Location': payload.locations[stop[1]],
+                        'Due': stop[2],
+                        'Delivered': stop[3],
+                        'Late?': stop[4] ? 'Yes' : 'No',
+                        'Mileage': truck.mileage.toFixed(1)
+                    };
+                });
+                var table = {
+                    'type': 'DataTable',
+                    'namespace': 'dash_table',
+                    'props': Object.assign({'columns': TABLE_COLUMNS, 'data': rows}, TABLE_STYLE)
+                };
+                tables.push(html('Div', [html('H5', 'Truck ' + (i + 1) + ' Mileage: ' + truck.mileage.toFixed(1)), table, html('Hr', null)]));
+            });
+            return html('Div', [
+                html('H4', 'Total Cost: $' + cost.total.toFixed(2)),
+                html('H6', cost.miles.toFixed(1) + ' miles x $1, late packages: ' + solution.late + ' x $' + payload.costs.late +
+                ' + active trucks: ' + cost.active + ' x $' + payload.costs.truck),
+                html('H6', 'Solution: ' + (parseInt(index, 10) + 1) + ' Generation: ' + solution.generation),
+                html('Pre', assignments),
+                html('Div', tables)
+            ]);
+        }
+    }
+});
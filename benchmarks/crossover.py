@@ -0,0 +1,87 @@
+# Crossover operators compared on speed and solution quality.
+# Speed: time per pair of children for the original truck-half crossover on Genome objects ('vehicles'), the
+# compact truck-half crossover ('trucks') and the giant tour operators.  Quality: best cost reached by short
+# buffered GA runs with each operator, averaged over a few seeds.
+# Run from the repository root:  python -m benchmarks.crossover
+import argparse
+import contextlib
+import io
+import random
+import statistics
+import time
+from gen_utils import get_matrices, load_distances, load_packages
+from model import rng
+from model.compact_genome import CompactGenome, crossover_compact
+from model.genetic_algorithm import create_base_genome, create_initial_population, crossover, genetic_algorithm
+from model.package_table import PackageTable
+from model.permutation_crossover import PERMUTATION_CROSSOVERS
+
+METHODS = ('trucks',) + PERMUTATION_CROSSOVERS
+
+
+def time_per_pair(run, parents, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run(parents)
+        times.append(time.perf_counter() - start)
+    return min(times) / (len(parents) // 2)
+
+
+def speed(args, matrices):
+    print(f"{'packages':>8} " + ' '.join(f"{name + ' ms':>11}" for name in ('vehicles',) + METHODS))
+    for count in args.packages:
+        packages = load_packages(count, load_distances())
+        trucks = max(1, -(-count // args.capacity)) + 2
+        vehicles, _ = create_base_genome(trucks, args.capacity, 18.0, packages, 'vehicles')
+        compact = CompactGenome(PackageTable(packages), trucks, args.capacity)
+        vehicle_parents = create_initial_population(args.pairs * 2, vehicles)
+        compact_parents = create_initial_population(args.pairs * 2, compact)
+
+        row = [time_per_pair(lambda parents: crossover(parents, 1.0), vehicle_parents, args.repeats)]
+        for method in METHODS:
+            row.append(time_per_pair(lambda parents: crossover_compact(parents, 1.0, method=method),
+                                     compact_parents, args.repeats))
+        print(f"{count:>8} " + ' '.join(f"{seconds * 1000:>11.3f}" for seconds in row))
+
+
+def quality(args, matrices):
+    packages = load_packages(args.quality_packages, load_distances())
+    trucks = max(1, -(-args.quality_packages // args.capacity)) + 2
+    print(f"\n{args.quality_packages} packages, {trucks} trucks, pop {args.pop_size}, {args.generations} generations, "
+          f"seeds {args.seeds}")
+    print(f"{'method':>8} {'mean cost':>10} {'best cost':>10} {'seconds':>8}")
+    for method in METHODS:
+        costs = []
+        start = time.perf_counter()
+        for seed in args.seeds:
+            with contextlib.redirect_stdout(io.StringIO()):
+                _, cost = genetic_algorithm(trucks, args.capacity, 18.0, packages, matrices, pop_size=args.pop_size,
+                                            generations=args.generations, fitness_backend='numpy',
+                                            representation='buffered', seed=seed, crossover_method=method)
+            costs.append(cost)
+        elapsed = (time.perf_counter() - start) / len(args.seeds)
+        print(f"{method:>8} {statistics.mean(costs):>10.1f} {min(costs):>10.1f} {elapsed:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--packages', type=int, nargs='+', default=[100, 1000, 5000])
+    parser.add_argument('--capacity', type=int, default=60)
+    parser.add_argument('--pairs', type=int, default=20)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--quality-packages', type=int, default=200)
+    parser.add_argument('--pop-size', type=int, default=200)
+    parser.add_argument('--generations', type=int, default=60)
+    parser.add_argument('--seeds', type=int, nargs='+', default=[1, 2, 3])
+    args = parser.parse_args()
+
+    random.seed("WGUPS")
+    rng.reseed()
+    matrices = get_matrices(18.0)
+    speed(args, matrices)
+    quality(args, matrices)
+
+
+if __name__ == '__main__':
+    main()
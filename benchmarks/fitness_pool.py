@@ -0,0 +1,94 @@
+# Wall time of one generation's fitness evaluation, serial vs the persistent FitnessPool.
+# Before timing it checks that pooled scoring matches in process scoring when one pool is attached to engines
+# with different route builders in turn, the way runs with different routing settings share it.
+# Run from the repository root:  python -m benchmarks.fitness_pool
+import argparse
+import random
+import time
+from gen_utils import get_matrices, load_distances, load_packages
+from model import rng
+from model.compact_genome import CompactGenome
+from model.fitness_pool import FitnessPool
+from model.genetic_algorithm import create_initial_population
+from model.package_table import PackageTable
+from model.routing import RouteBuilder
+from model.vectorized_fitness import NumpyFitness
+
+
+# Scoring marks every truck clean, so each timed call gets copies with all their trucks dirty
+def dirty_copies(population):
+    copies = [genome.make_copy() for genome in population]
+    for genome in copies:
+        genome.truck_dirty[:] = True
+    return copies
+
+
+def best_time(score, population, repeats):
+    times = []
+    for _ in range(repeats):
+        genomes = dirty_copies(population)
+        start = time.perf_counter()
+        score(genomes)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+# (method, max_passes) of the route builders checked, None for the engine's own nearest neighbour
+CHECKED_BUILDERS = (None, ('keep', 0), ('vectorized', 2), None)
+
+
+def check_route_builders(table, matrices, base, pool):
+    population = create_initial_population(50, base)
+    for builder in CHECKED_BUILDERS:
+        serial = NumpyFitness.from_table(table, matrices)
+        pooled = NumpyFitness.from_table(table, matrices)
+        for engine in (serial, pooled):
+            if builder is not None:
+                engine.route_builder = RouteBuilder.from_engine(engine, *builder)
+        pool.attach(pooled)
+        expected = serial.evaluate_compact([genome.make_copy() for genome in population])
+        scored = pooled.evaluate_compact([genome.make_copy() for genome in population])
+        for (want, _, want_cost), (got, _, got_cost) in zip(expected, scored):
+            if want_cost != got_cost or (want.order != got.order).any():
+                raise AssertionError(f"pooled scoring differs from in process scoring with route builder {builder}")
+    print(f"pooled scoring matches in process scoring for route builders {CHECKED_BUILDERS}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--packages', type=int, default=500)
+    parser.add_argument('--trucks', type=int, default=10)
+    parser.add_argument('--capacity', type=int, default=60)
+    parser.add_argument('--populations', type=int, nargs='+', default=[500, 2000, 8000, 32000])
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    random.seed("WGUPS")
+    rng.reseed()
+    matrices = get_matrices(18.0)
+    table = PackageTable(load_packages(args.packages, load_distances()))
+    base = CompactGenome(table, args.trucks, args.capacity)
+
+    serial = NumpyFitness.from_table(table, matrices)
+    pooled = NumpyFitness.from_table(table, matrices)
+    pool = FitnessPool(workers=args.workers, min_rows=0)
+
+    print(f"{args.packages} packages, {args.trucks} trucks, {pool.workers} workers")
+    try:
+        check_route_builders(table, matrices, base, pool)
+        pool.attach(pooled)
+        print(f"{'population':>10} {'serial s':>10} {'pool s':>10} {'speedup':>8}")
+        for pop_size in args.populations:
+            population = create_initial_population(pop_size, base)
+            # first call warms the workers up
+            pooled.evaluate_compact(dirty_copies(population))
+            serial_time = best_time(serial.evaluate_compact, population, args.repeats)
+            pool_time = best_time(pooled.evaluate_compact, population, args.repeats)
+            print(f"{pop_size:>10} {serial_time:>10.3f} {pool_time:>10.3f} {serial_time / pool_time:>7.2f}x")
+    finally:
+        pool.shutdown()
+
+
+if __name__ == '__main__':
+    main()
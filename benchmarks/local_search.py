@@ -0,0 +1,74 @@
+# Checks for the memetic stage (model/local_search.py).
+# Runs seeded genetic_algorithm runs with local search on every representation, twice each, and checks that
+#   - every entry of best_solutions_out still scores its recorded total_cost once the run is over, so genomes
+#     local search improves later on aren't the ones that were saved
+#   - runs on a move budget (local_search_moves) repeat exactly
+# Run from the repository root:  python -m benchmarks.local_search
+import argparse
+import random
+from gen_utils import get_matrices, load_distances, load_packages
+from model import rng
+from model.compact_genome import CompactGenome
+from model.genetic_algorithm import evaluate_fitness, genetic_algorithm
+from model.routing import RouteBuilder
+from model.vectorized_fitness import NumpyFitness
+
+REPRESENTATIONS = (('vehicles', 'python'), ('vehicles', 'numpy'), ('compact', 'numpy'), ('buffered', 'numpy'))
+
+
+def run(args, representation, fitness_backend, islands):
+    random.seed("WGUPS")
+    rng.reseed()
+    packages = load_packages(args.packages, load_distances())
+    matrices = get_matrices(18.0)
+    best_solutions = []
+    _, best_cost = genetic_algorithm(args.trucks, args.capacity, 18.0, packages, matrices, pop_size=args.pop_size,
+                                     generations=args.generations, best_solutions_out=best_solutions,
+                                     fitness_backend=fitness_backend, representation=representation, islands=islands,
+                                     seed=7, local_search_top_k=args.top_k, local_search_moves=args.moves,
+                                     verbose=False)
+    return packages, matrices, best_solutions, best_cost
+
+
+# Entries whose genome no longer scores what was recorded for it, routes kept as they are
+def changed_entries(packages, matrices, best_solutions):
+    genomes = [entry['genome'].make_copy() for entry in best_solutions]
+    for genome in genomes:
+        if isinstance(genome, CompactGenome):
+            genome.truck_dirty[:] = True
+        else:
+            genome.invalidate()
+    if isinstance(genomes[0], CompactGenome):
+        engine = NumpyFitness.from_table(genomes[0].table, matrices, genomes[0].departure_time)
+    else:
+        engine = NumpyFitness.from_packages(packages, matrices, genomes[0].departure_time)
+    scored = evaluate_fitness(genomes, matrices, route_builder=RouteBuilder.from_engine(engine, 'keep'))
+    costs = {id(genome): cost for genome, _, cost in scored}
+    return [entry['generation'] for entry, genome in zip(best_solutions, genomes)
+            if abs(costs[id(genome)] - entry['total_cost']) > 1e-6]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--packages', type=int, default=120)
+    parser.add_argument('--trucks', type=int, default=8)
+    parser.add_argument('--capacity', type=int, default=20)
+    parser.add_argument('--pop-size', type=int, default=60)
+    parser.add_argument('--generations', type=int, default=30)
+    parser.add_argument('--top-k', type=int, default=3)
+    parser.add_argument('--moves', type=int, default=400)
+    args = parser.parse_args()
+
+    for islands in (1, 2):
+        for representation, fitness_backend in REPRESENTATIONS:
+            packages, matrices, best_solutions, best_cost = run(args, representation, fitness_backend, islands)
+            changed = changed_entries(packages, matrices, best_solutions)
+            assert not changed, f"{representation}/{fitness_backend}: saved genomes changed after generations {changed}"
+            _, _, _, repeat_cost = run(args, representation, fitness_backend, islands)
+            assert repeat_cost == best_cost, f"{representation}/{fitness_backend}: {best_cost} then {repeat_cost}"
+            print(f"{representation:>8} {fitness_backend:>6} islands={islands}: {len(best_solutions)} best solutions "
+                  f"unchanged, best cost {best_cost:.1f} repeats")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+# HashChain vs the dense PackageStore under the access patterns the GA produces:
+# route lookups during fitness evaluation, keys() when filling genomes, safe_copy() in make_copy and removals.
+# Run from the repository root:  python -m benchmarks.package_store
+import argparse
+import random
+import time
+from model.hashchain import HashChain
+from model.package import Package
+from model.package_store import PackageStore
+
+
+def best_time(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def fill(store, packages):
+    for pkg in packages:
+        store.insert(pkg.id, pkg)
+    return store
+
+
+# One fitness evaluation's worth of lookups: every package of every genome, in route order
+def lookups(store, routes):
+    def run():
+        for route in routes:
+            for pkg_id in route:
+                store.get(pkg_id).address
+    return run
+
+
+def keys(store, calls):
+    def run():
+        for _ in range(calls):
+            list(store.keys())
+    return run
+
+
+def copies(store, calls):
+    def run():
+        for _ in range(calls):
+            store.safe_copy()
+    return run
+
+
+def removals(make_store, ids):
+    def run():
+        store = make_store()
+        for pkg_id in ids:
+            store.remove(pkg_id)
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--packages', type=int, nargs='+', default=[40, 1000, 5000])
+    parser.add_argument('--population', type=int, default=100)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    random.seed("WGUPS")
+    print(f"{'packages':>8} {'operation':>10} {'HashChain s':>12} {'Store s':>10} {'speedup':>8}")
+    for count in args.packages:
+        packages = [Package(pkg_id, random.randrange(27), 'EOD') for pkg_id in range(1, count + 1)]
+        ids = [pkg.id for pkg in packages]
+        routes = [random.sample(ids, count) for _ in range(args.population)]
+        chain = fill(HashChain(), packages)
+        store = fill(PackageStore(), packages)
+
+        cases = [
+            ('insert', lambda: fill(HashChain(), packages), lambda: fill(PackageStore(), packages)),
+            ('get', lookups(chain, routes), lookups(store, routes)),
+            ('keys', keys(chain, args.population), keys(store, args.population)),
+            ('safe_copy', copies(chain, args.population), copies(store, args.population)),
+            ('remove', removals(lambda: fill(HashChain(), packages), ids), removals(lambda: fill(PackageStore(), packages), ids)),
+        ]
+        for name, chain_case, store_case in cases:
+            chain_time = best_time(chain_case, args.repeats)
+            store_time = best_time(store_case, args.repeats)
+            print(f"{count:>8} {name:>10} {chain_time:>12.5f} {store_time:>10.5f} {chain_time / store_time:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,240 @@
+# Benchmark suite for the GA pipeline over a grid of package counts, truck counts and population sizes.
+# Every cell of the grid times one population's worth of evaluate_fitness, selection, crossover, mutation,
+# Genome.make_copy and sort_truck_routes_by_location, then a short full genetic_algorithm run, and records
+# throughput (genomes per second), the best cost the run reached and the peak RSS of the process.
+# Instances are synthetic: the WGUPS packages topped up with generated ones by load_packages, seeded with
+# random.seed("WGUPS") so every version of the code sees the same ones.  Truck capacity is derived from the
+# package and truck counts with some slack.
+# Each cell runs in a fresh process so its peak RSS is its own.  Results are saved as JSON, --compare prints
+# the speedup of every cell against an earlier results file.
+# The default grid takes a while, the 5000 package cells dominate.  Trim it with --packages / --trucks / --pop-sizes.
+# Run from the repository root:  python -m benchmarks.suite [--output results.json] [--compare old.json]
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import platform
+import random
+import subprocess
+import sys
+import time
+import numpy as np
+from gen_utils import get_matrices, load_distances, load_packages
+from model import rng
+from model.genetic_algorithm import (create_base_genome, create_initial_population, crossover, evaluate_fitness,
+                                     genetic_algorithm, mutation, parent_count, selection)
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+OPERATIONS = ('evaluate_fitness', 'selection', 'crossover', 'mutation', 'make_copy', 'sort_routes', 'genetic_algorithm')
+
+# Representation the cell is built on -> the genetic_algorithm settings used for its full run
+GA_SETTINGS = {
+    'vehicles': {'representation': 'vehicles', 'fitness_backend': 'python'},
+    'compact': {'representation': 'buffered', 'fitness_backend': 'numpy'},
+}
+
+
+# Best of repeats, each timed call gets fresh inputs from setup so in place operators start from the same state
+def best_time(run, setup, repeats):
+    times = []
+    for _ in range(repeats):
+        inputs = setup()
+        start = time.perf_counter()
+        run(inputs)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def capacity_for(package_count, truck_count):
+    return max(1, -(-package_count * 5 // (truck_count * 4)))
+
+
+def run_cell(cell, repeats, generations):
+    random.seed("WGUPS")
+    rng.reseed()
+    matrices = get_matrices(18.0)
+    d_matrix, _ = matrices
+    packages = load_packages(cell['packages'], load_distances())
+    capacity = capacity_for(cell['packages'], cell['trucks'])
+    representation = cell['representation']
+    pop_size = cell['pop_size']
+    base, _ = create_base_genome(cell['trucks'], capacity, 18.0, packages,
+                                 'vehicles' if representation == 'vehicles' else 'compact')
+
+    population = create_initial_population(pop_size, base)
+    scored = evaluate_fitness([genome.make_copy() for genome in population], matrices)
+    parents = selection(scored, parent_count(pop_size))
+    children = crossover(parents, 1.0)
+
+    def fresh(genomes):
+        return lambda: [genome.make_copy() for genome in genomes]
+
+    # every truck dirty, so the route sort has to order all of them
+    def unsorted():
+        copies = [genome.make_copy() for genome in population]
+        for genome in copies:
+            genome.invalidate()
+        return copies
+
+    seconds = {
+        'evaluate_fitness': best_time(lambda pop: evaluate_fitness(pop, matrices), fresh(population), repeats),
+        'selection': best_time(lambda pop: selection(pop, parent_count(pop_size)), lambda: scored, repeats),
+        'crossover': best_time(lambda pop: crossover(pop, 1.0), lambda: parents, repeats),
+        'mutation': best_time(lambda pop: mutation(pop, 1.0), fresh(children), repeats),
+        'make_copy': best_time(lambda pop: [genome.make_copy() for genome in pop], lambda: population, repeats),
+    }
+    # genomes handled per timed call
+    counts = {
+        'evaluate_fitness': pop_size,
+        'selection': parent_count(pop_size),
+        'crossover': len(parents),
+        'mutation': len(children),
+        'make_copy': pop_size,
+    }
+    # the compact engine orders routes inside its fitness evaluation, there is no separate sort to time
+    if representation == 'vehicles':
+        seconds['sort_routes'] = best_time(
+            lambda pop: [genome.sort_truck_routes_by_location(d_matrix) for genome in pop], unsorted, repeats)
+        counts['sort_routes'] = pop_size
+
+    random.seed("WGUPS")
+    rng.reseed()
+    run_info = {}
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        _, best_cost = genetic_algorithm(cell['trucks'], capacity, 18.0, packages, matrices, pop_size=pop_size,
+                                         generations=generations, run_info_out=run_info, verbose=False,
+                                         **GA_SETTINGS[representation])
+    seconds['genetic_algorithm'] = time.perf_counter() - start
+    counts['genetic_algorithm'] = run_info['generations'] * pop_size
+
+    result = dict(cell)
+    result['capacity'] = capacity
+    result['seconds'] = seconds
+    result['throughput'] = {name: counts[name] / seconds[name] if seconds[name] else None for name in seconds}
+    result['best_cost'] = best_cost
+    result['generations'] = run_info['generations']
+    result['peak_rss_mb'] = peak_rss_mb()
+    return result
+
+
+def run_isolated(cell, repeats, generations):
+    # a spawned process starts from a clean heap, so ru_maxrss is this cell's own peak
+    with multiprocessing.get_context('spawn').Pool(1) as pool:
+        return pool.apply(run_cell, (cell, repeats, generations))
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def grid(args):
+    cells = []
+    for representation in args.representations:
+        for package_count in args.packages:
+            if representation == 'vehicles' and package_count > args.max_vehicle_packages:
+                continue
+            for truck_count in args.trucks:
+                for pop_size in args.pop_sizes:
+                    cells.append({'representation': representation, 'packages': package_count,
+                                  'trucks': truck_count, 'pop_size': pop_size})
+    return cells
+
+
+def cell_key(cell):
+    return cell['representation'], cell['packages'], cell['trucks'], cell['pop_size']
+
+
+def print_header():
+    print(f"{'repr':>8} {'packages':>8} {'trucks':>6} {'pop':>5} "
+          + ' '.join(f"{name[:10]:>10}" for name in OPERATIONS) + f" {'best cost':>10} {'rss MB':>8}")
+
+
+def print_row(result):
+    rates = ' '.join(f"{result['throughput'][name]:>10.0f}" if result['throughput'].get(name) else f"{'-':>10}"
+                     for name in OPERATIONS)
+    rss = f"{result['peak_rss_mb']:>8.0f}" if result['peak_rss_mb'] is not None else f"{'-':>8}"
+    print(f"{result['representation']:>8} {result['packages']:>8} {result['trucks']:>6} {result['pop_size']:>5} "
+          f"{rates} {result['best_cost']:>10.1f} {rss}")
+
+
+# Speedup of every operation over an earlier results file, for the cells both runs have
+def compare(results, path):
+    with open(path) as file:
+        previous = {cell_key(result): result for result in json.load(file)['results']}
+    print(f"\nspeedup over {path}")
+    print(f"{'repr':>8} {'packages':>8} {'trucks':>6} {'pop':>5} "
+          + ' '.join(f"{name[:10]:>10}" for name in OPERATIONS) + f" {'cost diff':>10}")
+    for result in results:
+        old = previous.get(cell_key(result))
+        if old is None:
+            continue
+        ratios = []
+        for name in OPERATIONS:
+            if name in result['seconds'] and name in old['seconds'] and result['seconds'][name]:
+                ratios.append(f"{old['seconds'][name] / result['seconds'][name]:>9.2f}x")
+            else:
+                ratios.append(f"{'-':>10}")
+        print(f"{result['representation']:>8} {result['packages']:>8} {result['trucks']:>6} {result['pop_size']:>5} "
+              + ' '.join(ratios) + f" {result['best_cost'] - old['best_cost']:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--packages', type=int, nargs='+', default=[40, 200, 1000, 5000])
+    parser.add_argument('--trucks', type=int, nargs='+', default=[10, 50])
+    parser.add_argument('--pop-sizes', type=int, nargs='+', default=[50, 200])
+    parser.add_argument('--representations', nargs='+', choices=sorted(GA_SETTINGS), default=['vehicles', 'compact'])
+    # the python fitness path is quadratic in route length, bigger instances are left to the compact genomes
+    parser.add_argument('--max-vehicle-packages', type=int, default=1000)
+    parser.add_argument('--generations', type=int, default=20)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--in-process', action='store_true', help="don't isolate cells, peak RSS is then cumulative")
+    parser.add_argument('--output', default='benchmark-results.json')
+    parser.add_argument('--compare', default=None)
+    args = parser.parse_args()
+
+    results = []
+    print_header()
+    for cell in grid(args):
+        if args.in_process:
+            result = run_cell(cell, args.repeats, args.generations)
+        else:
+            result = run_isolated(cell, args.repeats, args.generations)
+        print_row(result)
+        results.append(result)
+
+    report = {
+        'commit': git_commit(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'settings': vars(args),
+        'results': results,
+    }
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f"\nsaved {len(results)} cells to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,16 +1,24 @@
 import csv
 import datetime
+import functools
+import os
 import random
 
-from model.hashchain import HashChain
-from model.package import Package
+import numpy as np
+
+from model.package_store import PackageStore
+from model.package import PackageSpec
+from model.vectorized_fitness import time_matrix_to_microseconds
 
 #used to load distance matrix and time matrix.  Imported from my c950 project.
 
+DISTANCES_CSV = "data/distances.csv"
+PACKAGES_CSV = "./data/packages.csv"
 
-def load_distances():
-    # Load distances from csv file as a symmetrical distance map
-    with open("data/distances.csv", 'r') as myFile:
+
+#Parses the lower triangular csv into a full symmetrical matrix
+def parse_distances(path=DISTANCES_CSV):
+    with open(path, 'r') as myFile:
         tmp = list(csv.reader(myFile))
         d_matrix = []
         for i, row in enumerate(tmp):
@@ -23,6 +31,38 @@ def load_distances():
             d_matrix.append(row_values)
     return d_matrix
 
+#The parsed matrix is kept in a .npy sidecar next to the csv and memory-mapped on later loads.
+#The sidecar is rebuilt whenever the csv is newer, and skipped if the data folder is read only.
+def load_npy_sidecar(path, parse):
+    sidecar = os.path.splitext(path)[0] + '.npy'
+    try:
+        if os.path.getmtime(sidecar) >= os.path.getmtime(path):
+            return np.load(sidecar, mmap_mode='r')
+    except (OSError, ValueError):
+        pass
+    array = np.array(parse(path), dtype=np.float64)
+    try:
+        temp = f'{sidecar}.{os.getpid()}.tmp'
+        with open(temp, 'wb') as sidecar_file:
+            np.save(sidecar_file, array)
+        os.replace(temp, sidecar)
+    except OSError:
+        pass
+    return array
+
+#Shared read-only distance array, parsed once per process
+@functools.lru_cache(maxsize=None)
+def distance_array():
+    array = load_npy_sidecar(DISTANCES_CSV, parse_distances)
+    array.setflags(write=False)
+    return array
+
+# Load distances from csv file as a symmetrical distance map.
+# Every caller gets the same immutable rows (tuples index as fast as the lists they replace).
+@functools.lru_cache(maxsize=None)
+def load_distances():
+    return tuple(tuple(row) for row in distance_array().tolist())
+
 #Pregenerate a time matrix so slow math (division) only needs to be calculated once
 def get_time_matrix(d_matrix, speed):
     time_matrix = [
@@ -31,34 +71,46 @@ def get_time_matrix(d_matrix, speed):
     ]
     return time_matrix
 
-#get both distance and time matrix as a tuple
+#get both distance and time matrix as a tuple, memoized per speed so runs share one instance.
+#The timedelta matrix is what the GA and its displays work in, get_time_microseconds has the same times in the
+#int64 microseconds the numpy engines use.
+@functools.lru_cache(maxsize=32)
 def get_matrices(speed):
     d_matrix = load_distances()
-    t_matrix = get_time_matrix(d_matrix, speed)
+    t_matrix = tuple(tuple(row) for row in get_time_matrix(d_matrix, speed))
     return d_matrix, t_matrix
 
+#Travel times as int64 microseconds, one shared read-only array per speed.  It is the array every NumpyFitness
+#built on get_matrices(speed) uses, so the conversion runs once per speed and process.
+@functools.lru_cache(maxsize=32)
+def get_time_microseconds(speed):
+    return time_matrix_to_microseconds(get_matrices(speed)[1])
+
+#package csv rows, read once
+@functools.lru_cache(maxsize=None)
+def package_rows():
+    with open(PACKAGES_CSV, 'r') as myFile:
+        return tuple(tuple(item) for item in csv.reader(myFile))
+
 def load_packages(qty,d_matrix):
-    packages = HashChain()
+    packages = PackageStore()
     existing_ids = set()
     address_count = len(d_matrix)
 
-    with open("./data/packages.csv", 'r') as myFile:
-        items = list(csv.reader(myFile))
-        for item in items:
-            pkg_id = int(item[0])
-            pkg = Package(pkg_id, item[1], item[2])
-            packages.insert(pkg_id, pkg)
-            existing_ids.add(pkg_id)
-            qty -= 1
-            if qty == 0:
-                return packages
+    for item in package_rows():
+        pkg = PackageSpec.from_csv(item[0], item[1], item[2])
+        packages.insert(pkg.id, pkg)
+        existing_ids.add(pkg.id)
+        qty -= 1
+        if qty == 0:
+            return packages
 
     # If qty not yet met, generate dummy entries with placeholder address/time_due
     next_id = max(existing_ids) + 1 if existing_ids else 1
     while qty > 0:
         if random.random() > 0.2:
             addr = random.randrange(0,address_count)
-            packages.insert(next_id, Package(next_id,addr , "EOD"))
+            packages.insert(next_id, PackageSpec.from_csv(next_id, addr, "EOD"))
         else:
             #random time between 9:30 and 12:30
             addr = random.randrange(0, address_count)
@@ -68,7 +120,7 @@ def load_packages(qty,d_matrix):
             hours = random_minutes // 60
             minutes = random_minutes % 60
             time_due = f"{hours:02d}:{minutes:02d}"
-            packages.insert(next_id, Package(next_id, addr, time_due))
+            packages.insert(next_id, PackageSpec.from_csv(next_id, addr, time_due))
         next_id += 1
         qty -= 1
 
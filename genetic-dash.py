@@ -1,12 +1,24 @@
 import datetime
 import os
-from dash import Dash, html, dash_table, dcc, callback, Output, Input, State,callback_context,no_update
+import time
+import uuid
+from contextlib import nullcontext
+from urllib.parse import parse_qs
+import diskcache
+from dash import Dash, DiskcacheManager, html, dcc, callback, Output, Input, State,callback_context,no_update
+from dash import clientside_callback, ClientsideFunction
 import plotly.express as px
 import plotly.graph_objects as go
 from gen_utils import get_matrices, load_packages, load_distances
-import networkx as nx
 import pandas as pd
-from model.genetic_algorithm import genetic_algorithm
+import numpy as np
+from model.genetic_algorithm import genetic_algorithm_generations
+from model.fitness_pool import FitnessPool
+from model.solution_store import SolutionStore
+from model.metrics import RunMetrics, add_totals, empty_totals, prometheus_text
+from model.profiling import Profiler, profile_path
+from model.costs import LATE_COST, TRUCK_COST
+from flask import Response
 import dash_bootstrap_components as dbc
 from dash_bootstrap_templates import load_figure_template
 import hashlib
@@ -14,16 +26,86 @@ import hashlib
 #Import Data
 addresses = pd.read_csv('./data/addresses.csv')
 d_matrix = load_distances()
+#Runs are background callbacks in their own processes, progress and results reach the server through this cache
+job_cache = diskcache.Cache(os.environ.get('GENETIC_DASH_CACHE', './cache'))
+background_callback_manager = DiskcacheManager(job_cache)
 #Importing styles from dash bootstrap templates
-app = Dash(__name__, external_stylesheets=[dbc.themes.CYBORG])
+app = Dash(__name__, external_stylesheets=[dbc.themes.CYBORG], background_callback_manager=background_callback_manager)
+#WSGI entry point, e.g. gunicorn genetic-dash:server
+server = app.server
 port = int(os.environ.get('PORT', 8050))
 template = 'cyborg'
 load_figure_template(template)
 
-#store best solutions in memory
-global best_solutions_memory
-best_solutions_memory = []
-last_env_hash = None
+#Every run is its own background process, so its fitness workers can't outlive it: a run starts a pool, reuses it
+#for all its generations and shuts it down when it ends.  Generations with at least POOL_MIN_ROWS changed trucks
+#are scored on the workers (the default UI run changes well over that many), on a single core there is no pool.
+POOL_MIN_ROWS = int(os.environ.get('GENETIC_DASH_POOL_MIN_ROWS', 256))
+
+def create_fitness_pool():
+    if (os.cpu_count() or 1) < 2:
+        return None
+    return FitnessPool(min_rows=POOL_MIN_ROWS)
+
+#how often a run writes its progress to the cache, in seconds
+PROGRESS_WRITE_INTERVAL = 0.25
+#progress entries outlive their run long enough for the last poll, in seconds
+PROGRESS_EXPIRE = 3600
+
+#how the run summary explains why a run stopped, see model/convergence.py
+STOP_REASON_TEXT = {
+    'generations': 'all generations run',
+    'stagnation': 'no improvement for the stagnation window',
+    'time_budget': 'time budget used up',
+    'target_cost': 'target cost reached',
+    'diversity': 'population diversity fell below the floor',
+    'stopped': 'stopped while running',
+}
+
+#best solutions are kept per browser session in the job cache, so every server worker and run process shares them.
+#The least recently used sessions are evicted once all of them together pass the budget.
+solution_store = SolutionStore(job_cache, memory_budget=int(os.environ.get('GENETIC_DASH_STORE_MB', 256)) * 1024 * 1024)
+
+#GA phase timings and counters summed over every run, runs add to them as they go.  Served at /metrics.
+METRICS_KEY = 'metrics-totals'
+
+def record_metrics(totals, finished_run=None):
+    with job_cache.transact():
+        stored = job_cache.get(METRICS_KEY) or {'totals': empty_totals(), 'last_run': None}
+        add_totals(stored['totals'], totals)
+        if finished_run is not None:
+            stored['totals']['counters']['runs'] = stored['totals']['counters'].get('runs', 0) + 1
+            stored['last_run'] = finished_run
+        job_cache.set(METRICS_KEY, stored)
+
+#Prometheus scrape target
+@server.route('/metrics')
+def metrics_endpoint():
+    stored = job_cache.get(METRICS_KEY) or {'totals': empty_totals(), 'last_run': None}
+    gauges = {}
+    if stored['last_run'] is not None:
+        gauges = {
+            'last_run_best_cost': ('Best cost of the last finished run.', stored['last_run']['best_cost']),
+            'last_run_generations': ('Generations of the last finished run.', stored['last_run']['generations']),
+            'last_run_seconds': ('Wall time of the last finished run.', stored['last_run']['elapsed']),
+        }
+    return Response(prometheus_text(stored['totals'], gauges), mimetype='text/plain; version=0.0.4')
+
+#Runs are profiled when the page was opened with ?profile=1, or all of them when GENETIC_DASH_PROFILE is set.
+#The pstats and collapsed stack files go to GENETIC_DASH_PROFILE_DIR, see model/profiling.py
+PROFILE_DIR = os.environ.get('GENETIC_DASH_PROFILE_DIR', './profiles')
+
+def profile_requested(search):
+    if os.environ.get('GENETIC_DASH_PROFILE', '') not in ('', '0'):
+        return True
+    values = parse_qs((search or '').lstrip('?')).get('profile', [])
+    return bool(values) and values[-1] not in ('', '0', 'false')
+
+def load_best_solutions(session_id):
+    return solution_store.load(session_id)[1]
+
+def progress_key(run_id):
+    return f'progress-{run_id}'
 
 #Helper to detect environment changes
 def compute_environment_hash(num_trucks, truck_capacity, truck_speed, package_quantity):
@@ -33,182 +115,104 @@ def compute_environment_hash(num_trucks, truck_capacity, truck_speed, package_qu
 
 
 
-#creates a network graph from a distance matrix
-def create_graph(distance_matrix):
-    G = nx.Graph()
-    n = len(distance_matrix)
-
-    # Add Nodes
-    for i in range(n):
-        G.add_node(i, label=f"Location {i}")
-
-    # Add Edges
-    for i in range(n):
-        for j in range(i+1, n):
-            weight = distance_matrix[i][j]
-            G.add_edge(i, j, weight=weight)
-    return G
+#Map layers are built once at startup, every map figure reuses them.
+#Node positions, labels and hover text as plain lists indexed by address
+def build_map_nodes(addresses_df, count):
+    rows = addresses_df.iloc[:count]
+    return {
+        'lon': rows['longitude'].tolist(),
+        'lat': rows['latitude'].tolist(),
+        'text': [str(i) for i in range(count)],
+        'hovertext': (rows['location'] + '<br>' + rows['address']).tolist(),
+    }
 
-def plot_map(G, addresses_df, genome=None):
-    pos = {
-        i: (addresses_df.iloc[i]['longitude'], addresses_df.iloc[i]['latitude'])
-        for i in range(len(addresses_df))
+#Every address pair as one line trace, the segments separated by None
+def build_base_edges(nodes):
+    first, second = np.triu_indices(len(nodes['lon']), k=1)
+    edges = {}
+    for axis in ('lon', 'lat'):
+        values = np.array(nodes[axis], dtype=object)
+        segments = np.full((len(first), 3), None, dtype=object)
+        segments[:, 0] = values[first]
+        segments[:, 1] = values[second]
+        edges[axis] = segments.ravel().tolist()
+    return {
+        "type": "scattermap",
+        "lon": edges['lon'],
+        "lat": edges['lat'],
+        "mode": "lines",
+        "line": {"width": 0.5, "color": "gray"},
+        "hoverinfo": "skip",
+        "name": "Default Routes"
     }
 
-    edge_traces = []
-    if genome is not None:
-        colors = px.colors.qualitative.Plotly
-        for i, truck in enumerate(genome.trucks):
-            if not truck.packages:
-                continue
-            color = colors[i % len(colors)]
-            route = [0]
-            for pkg_id in truck.packages:
-                pkg = genome.packages.get(pkg_id)
-                if pkg and pkg.address in pos:
-                    route.append(pkg.address)
-            route.append(0)
-
-            edge_trace = {
-                "type": "scattermap",
-                "lon": [pos[pt][0] for pt in route],
-                "lat": [pos[pt][1] for pt in route],
-                "mode": "lines",
-                "line": {"width": 2, "color": color},
-                "name": f"Truck {i+1}"
-            }
-            edge_traces.append(edge_trace)
-    else:
-        for edge in G.edges():
-            x0, y0 = pos[edge[0]]
-            x1, y1 = pos[edge[1]]
-            edge_trace = {
-                "type": "scattermap",
-                "lon": [x0, x1],
-                "lat": [y0, y1],
-                "mode": "lines",
-                "line": {"width": 0.5, "color": "gray"},
-                "name": "Default Routes"
-            }
-            edge_traces.append(edge_trace)
-
-    # Add node markers
-    node_trace = {
+def build_node_trace(nodes):
+    return {
         "type": "scattermap",
-        "lon": [pos[i][0] for i in G.nodes()],
-        "lat": [pos[i][1] for i in G.nodes()],
+        "lon": nodes['lon'],
+        "lat": nodes['lat'],
         "mode": "markers+text",
         "marker": {
-            "size": [12 if i == 0 else 8 for i in G.nodes()],
-            "color": ["blue" if i == 0 else "red" for i in G.nodes()],
+            "size": [12 if i == 0 else 8 for i in range(len(nodes['lon']))],
+            "color": ["blue" if i == 0 else "red" for i in range(len(nodes['lon']))],
         },
-        "text": [str(i) for i in G.nodes()],
+        "text": nodes['text'],
         "textposition": "top center",
-        "hovertext": [
-            f"{addresses_df.iloc[i]['location']}<br>{addresses_df.iloc[i]['address']}"
-            for i in G.nodes()
-        ],
+        "hovertext": nodes['hovertext'],
         "name": "Locations"
     }
 
-    fig = go.Figure(data=edge_traces + [node_trace])
-
-    fig.update_layout(
-        title="WGUPS Delivery Map",
-        autosize=True,
-        hovermode="closest",
-        map=dict(
-            # Other Options for styles include:
-            # carto-positron – light, minimal
-            # outdoors
-            # carto-voyager normal topo
-            # dark / light / streets - standards
-            # carto-darkmatter – dark
-            # satellite
-            # stamen-terrain – topo
-            # "stamen-toner" – B&W
-            style="carto-darkmatter",
-            center=dict(lat=40.6908, lon=-111.8910),
-            zoom=10
-        ),
-        margin=dict(t=30, b=10, l=10, r=10)
-    )
-
-    return fig
-
-
-    #Nodes tracing lists
-    node_x = []
-    node_y = []
-    node_text = []
-    node_info = []
-
-    for node in G.nodes():
-        x, y = pos[node]
-        node_x.append(x)
-        node_y.append(y)
-
-        # Get address info if available
-        location_name = addresses_df.iloc[node]['location']
-        address = addresses_df.iloc[node]['address']
-        node_info.append(f"Location {node}<br>{location_name}<br>{address}")
-        node_text.append(str(node))
-
-
-    node_trace = go.Scatter(
-        x=node_x,
-        y=node_y,
-        mode='markers+text',
-        hoverinfo='text',
-        hovertext=node_info,
-        text=node_text,
-        textposition="middle center",
-        marker=dict(
-            color ='red',
-            size = 12,
-            line=dict(width=2, color='white')
-        ),
-        name='Delivery Locations'
-    )
-
-    #Create the figure
-    fig = go.Figure(data=edge_traces + [node_trace])
-
-    fig.update_layout(
-        title='Salt Lake City Delivery Network Map',
-        font=dict(size=16),
-        showlegend=True,
-        hovermode='closest',
-        margin=dict(b=20, l=5, r=5, t=40),
-        annotations=[dict(
-            text="Geographic map showing delivery locations and routes in Salt Lake City area.",
-            showarrow=False,
-            xref="paper", yref="paper",
-            x=0.005, y=-0.002,
-            xanchor='left', yanchor='bottom',
-            font=dict(size=12)
-        )],
-        xaxis=dict(
-            title="Longitude",
-            showgrid=True,
-            zeroline=False,
-            gridcolor='lightgray'
-        ),
-        yaxis=dict(
-            title="Latitude",
-            showgrid=True,
-            zeroline=False,
-            gridcolor='lightgray',
-            scaleanchor="x",
-            scaleratio=1
-        ),
-        plot_bgcolor='white'
-    )
-
-    return fig
+map_layout = dict(
+    title="WGUPS Delivery Map",
+    autosize=True,
+    hovermode="closest",
+    map=dict(
+        # Other Options for styles include:
+        # carto-positron – light, minimal
+        # outdoors
+        # carto-voyager normal topo
+        # dark / light / streets - standards
+        # carto-darkmatter – dark
+        # satellite
+        # stamen-terrain – topo
+        # "stamen-toner" – B&W
+        style="carto-darkmatter",
+        center=dict(lat=40.6908, lon=-111.8910),
+        zoom=10
+    ),
+    margin=dict(t=30, b=10, l=10, r=10)
+)
 
-# Create the network graph from distance matrix
-G = create_graph(d_matrix)
+map_nodes = build_map_nodes(addresses, len(d_matrix))
+#everything the browser needs to draw the map, sent once with the page.  The no-solution view is the base edges
+#under the nodes, a solution draws one line per truck over the same node arrays (assets/solution_browser.js).
+map_base = {
+    'layout': go.Figure(layout=map_layout).to_plotly_json()['layout'],
+    'edges': build_base_edges(map_nodes),
+    'nodes': build_node_trace(map_nodes),
+    'colors': px.colors.qualitative.Plotly,
+}
+
+EOD = datetime.timedelta(hours=23, minutes=59, seconds=59)
+
+#Compact form of the best solutions for the solution browser.  Location names are sent once, each solution
+#has its cost breakdown and every truck its mileage and stops as [package id, address, due, delivered, late].
+def solution_payload(best_solutions):
+    solutions = []
+    for entry in best_solutions:
+        genome = entry['genome']
+        trucks = []
+        for truck in genome.trucks:
+            stops = []
+            for pkg_id, delivered_time in truck.delivery_log:
+                pkg = genome.packages.get(pkg_id)
+                due = "EOD" if pkg.time_due == EOD else format_time(pkg.time_due)
+                stops.append([int(pkg_id), int(pkg.address), due, format_time(delivered_time),
+                              int(delivered_time > pkg.time_due)])
+            trucks.append({'mileage': float(truck.mileage), 'stops': stops})
+        solutions.append({'generation': entry['generation'], 'late': len(genome.late_packages), 'trucks': trucks})
+    return {'locations': addresses['location'].tolist(), 'costs': {'truck': TRUCK_COST, 'late': LATE_COST},
+            'solutions': solutions}
 
 app.layout = html.Div([
     dbc.Container([
@@ -257,15 +261,47 @@ app.layout = html.Div([
                 dbc.Input(id='mutation-rate',type='number',min=0.0,max=1,step=0.01,value=0.02),
             ]),
         ]),
+
+        dbc.Row([
+            dbc.Col([
+                dbc.Label('Stop After Stagnant Generations'),
+                dbc.Input(id='stagnation-generations',type='number',min=1,max=50000,step=1,value=1000),
+            ]),
+            dbc.Col([
+                dbc.Label('Time Budget (s)'),
+                dbc.Input(id='time-budget',type='number',min=1,max=86400,step=1),
+            ]),
+            dbc.Col([
+                dbc.Label('Target Cost'),
+                dbc.Input(id='target-cost',type='number',min=0,step=0.1),
+            ]),
+            dbc.Col([
+                dbc.Label('Diversity Floor'),
+                dbc.Input(id='diversity-floor',type='number',min=0.0,max=1,step=0.01),
+            ]),
+        ]),
+        dbc.Row([
+            dbc.Col([
+                dbc.Switch(id='adaptive-control', label='Adapt rates and population size while running', value=False),
+            ]),
+        ], className='mt-2'),
         html.Br(),
         dbc.Row([
             dbc.Button('RUN!', id='run-genetics', n_clicks=0, color='primary'),
+            dbc.Button('Cancel Run', id='cancel-run', n_clicks=0, color='warning', disabled=True, className='mt-2'),
             dbc.Button( 'Clear Solution History', id='clear-solution-history', color='danger',className='mt-2'),
             dbc.Label('Best solutions will be fed to the next run unless data is cleared or the environment is changed.', align='center', color='secondary'),
         ]),
         html.Br(),
+        dbc.Progress(id='run-progress', value=0, label='', striped=True, animated=True, style={'height': '20px'}),
+        dcc.Graph(id='live-cost', style={'height': '250px'}),
+        dcc.Interval(id='progress-interval', interval=500, disabled=True),
+        dcc.Location(id='url', refresh=False),
+        dcc.Store(id='session-id', storage_type='session'),
+        dcc.Store(id='run-id'),
         dcc.Store(id='run-complete-flag', data=0),
-        dcc.Store(id='loading-flag', data=False),
+        dcc.Store(id='map-base', data=map_base),
+        dcc.Store(id='solution-payload'),
         dbc.Spinner(
             html.Div(id='output-summary'),
             color="primary",
@@ -308,31 +344,95 @@ app.layout = html.Div([
     dcc.Graph(id='generation-track')
 ])
 
+#each browser session gets an id on its first load, its solutions are stored under it
 @callback(
-    Output('run-genetics', 'disabled'),
-    Input('loading-flag','data')
+    Output('session-id', 'data'),
+    Input('session-id', 'modified_timestamp'),
+    State('session-id', 'data')
 )
-def toggle_run_button(is_loading):
-    return is_loading
+def ensure_session_id(_, session_id):
+    if session_id:
+        return no_update
+    return uuid.uuid4().hex
 
+#each click gets its own run id, the run reports its progress under it
 @callback(
+    Output('run-id', 'data'),
+    Input('run-genetics', 'n_clicks'),
+    prevent_initial_call=True
+)
+def start_run(n_clicks):
+    return uuid.uuid4().hex
+
+@callback(
+    Output('run-progress', 'value'),
+    Output('run-progress', 'label'),
+    Output('live-cost', 'figure'),
+    Input('progress-interval', 'n_intervals'),
+    State('run-id', 'data'),
+    prevent_initial_call=True
+)
+def poll_run_progress(_, run_id):
+    progress = job_cache.get(progress_key(run_id)) if run_id else None
+    if not progress:
+        return 0, 'Starting...', no_update
+
+    history = progress['history']
+    fig = go.Figure(go.Scatter(
+        x=[generation for generation, _ in history],
+        y=[cost for _, cost in history],
+        mode='lines+markers',
+        line_shape='hv',
+        name='Best Cost'
+    ))
+    fig.update_layout(title='Best Cost So Far', xaxis_title='Generation', yaxis_title='Cost',
+                      margin=dict(t=30, b=10, l=10, r=10))
+    percent = 100 * progress['generation'] / progress['generations']
+    label = (f"Generation {progress['generation']}/{progress['generations']} - best cost {progress['best_cost']:.2f}"
+             f" - mean cost {progress['mean_cost']:.2f} - diversity {progress['diversity']:.2f}")
+    return percent, label, fig
+
+@callback(
+    Output('run-progress', 'label', allow_duplicate=True),
+    Input('cancel-run', 'n_clicks'),
+    prevent_initial_call=True
+)
+def show_cancelled(_):
+    return 'Run cancelled'
+
+#Solutions are browsed without the server: their payload is built once per finished run (or page load) and the
+#slider redraws the map and the loadouts from it in the browser, see assets/solution_browser.js
+@callback(
+    Output('solution-payload', 'data'),
+    Input('run-complete-flag', 'data'),
+    Input('session-id', 'data')
+)
+def build_solution_payload(_, session_id):
+    return solution_payload(load_best_solutions(session_id))
+
+clientside_callback(
+    ClientsideFunction(namespace='solutionBrowser', function_name='map'),
     Output('network-graph', 'figure'),
-    Input('solution-slider', 'value')
+    Input('solution-slider', 'value'),
+    Input('solution-payload', 'data'),
+    State('map-base', 'data')
+)
+
+clientside_callback(
+    ClientsideFunction(namespace='solutionBrowser', function_name='loadout'),
+    Output('truck-loadouts', 'children'),
+    Input('solution-slider', 'value'),
+    Input('solution-payload', 'data')
 )
-def update_network_graph(solution_idx):
-    solution_idx = int(solution_idx)
-    if 0 <= solution_idx < len(best_solutions_memory):
-        genome = best_solutions_memory[solution_idx]['genome']
-        return plot_map(G, addresses_df=addresses, genome=genome)
-    else:
-        return plot_map(G, addresses_df=addresses, genome=None)
 
 
 @callback(
     Output('graph-content', 'figure'),
     Input('run-complete-flag', 'data'),
+    State('session-id', 'data')
 )
-def update_graph(n_clicks):
+def update_graph(n_clicks, session_id):
+    best_solutions_memory = load_best_solutions(session_id)
     if not best_solutions_memory or n_clicks == 0:
         return go.Figure()
 
@@ -340,9 +440,9 @@ def update_graph(n_clicks):
     df = pd.DataFrame([
         {
             'generation': sol['generation'],
-            'late_cost': len(sol['genome'].late_packages) * 20,
+            'late_cost': len(sol['genome'].late_packages) * LATE_COST,
             'mileage_cost': sum(t.mileage for t in sol['genome'].trucks),
-            'trucks_cost': sum(1 for t in sol['genome'].trucks if t.packages) * 20
+            'trucks_cost': sum(1 for t in sol['genome'].trucks if t.packages) * TRUCK_COST
         }
         for sol in best_solutions_memory
     ])
@@ -398,82 +498,15 @@ def update_graph(n_clicks):
     return fig
 
 
-@callback(
-    Output('truck-loadouts', 'children'),
-    Input('solution-slider', 'value')
-)
-def update_truck_loadout(solution_idx):
-    solution_idx = int(solution_idx)
-    if 0 <= solution_idx < len(best_solutions_memory):
-        genome = best_solutions_memory[solution_idx]['genome']
-        generation = best_solutions_memory[solution_idx]['generation']
-        total_mileage = 0.0
-
-        truck_tables = []
-        for i, truck in enumerate(genome.trucks):
-            if not truck.packages:
-                continue
-            total_mileage += truck.mileage
-            data_rows = []
-
-            for pkg_id, delivered_time in truck.delivery_log:
-                pkg = genome.packages.get(pkg_id)
-                addr = addresses.iloc[pkg.address]['location']
-                due = "EOD" if pkg.time_due == datetime.timedelta(hours=23, minutes=59, seconds=59) else format_time(
-                    pkg.time_due)
-                delivered = format_time(delivered_time)
-                late = delivered_time > pkg.time_due
-                data_rows.append({
-                    "Package": pkg_id,
-                    "Location": addr,
-                    "Due": due,
-                    "Delivered": delivered,
-                    "Late?": "Yes" if late else "No",
-                    "Mileage": f"{truck.mileage:.1f}"
-                })
-
-            #this arranges everything together in a table for display
-            table = dash_table.DataTable(
-                columns=[
-                    {"name": "Package", "id": "Package"},
-                    {"name": "Location", "id": "Location"},
-                    {"name": "Due", "id": "Due"},
-                    {"name": "Del", "id": "Delivered"},
-                    {"name": "Late?", "id": "Late?"},
-                ],
-                data=data_rows,
-                style_table={'overflowX': 'auto'},
-                style_cell={'padding': '4px', 'textAlign': 'left','background-color': '#1e1e1e','color':'#f8f9fa','font-size':'10pt',},
-                style_header={'backgroundColor': '#1e1e1e', 'fontWeight': 'bold', 'color': '#ffffff'},
-                page_size=15
-            )
-
-            truck_tables.append(html.Div([
-                html.H5(f'Truck {i + 1} Mileage: {truck.mileage:.1f}'),
-                table,
-                html.Hr()
-            ]))
-        active_trucks = sum (1 for t in genome.trucks if t.packages)
-        late_count = len(genome.late_packages)
-        total_cost = total_mileage + active_trucks * 20 + late_count * 20
-        truck_displays = html.Div([
-            html.H4(f'Total Cost: ${total_cost:.2f}'),
-            html.H6(f'{total_mileage:.1f} miles x $1, late packages: {late_count} x $20 + active trucks: {active_trucks} x $20'),
-            html.H6(f'Solution: {solution_idx + 1} Generation: {generation}'),
-            html.Pre(str(genome)),
-            html.Div(truck_tables)
-        ])
-
-        return truck_displays
-
-    return "Please hit Run to Generate new solution sets."
 
 
 @callback(
     Output('generation-track', 'figure'),
-    Input('run-complete-flag', 'data')
+    Input('run-complete-flag', 'data'),
+    State('session-id', 'data')
 )
-def update_generation_graph(_):
+def update_generation_graph(_, session_id):
+    best_solutions_memory = load_best_solutions(session_id)
     if not best_solutions_memory:
         return go.Figure()
 
@@ -513,13 +546,16 @@ def update_generation_graph(_):
     return fig
 
 
+#Runs in a background process so the server keeps answering while the GA works.
+#Per generation progress goes to the job cache for poll_run_progress, and the cancel button kills the process.
 @callback(
     Output('output-summary', 'children'),
     Output('solution-slider', 'max'),
     Output('solution-slider', 'value'),
     Output('run-complete-flag', 'data'),
-    Output('loading-flag', 'data'),
-    Input('run-genetics', 'n_clicks'),
+    Output('run-progress', 'value', allow_duplicate=True),
+    Output('run-progress', 'label', allow_duplicate=True),
+    Input('run-id', 'data'),
     Input('clear-solution-history', 'n_clicks'),
     State('num-trucks', 'value'),
     State('truck-capacity', 'value'),
@@ -529,11 +565,28 @@ def update_generation_graph(_):
     State('crossover-rate', 'value'),
     State('mutation-rate', 'value'),
     State('package-quantity', 'value'),
-
+    State('stagnation-generations', 'value'),
+    State('time-budget', 'value'),
+    State('target-cost', 'value'),
+    State('diversity-floor', 'value'),
+    State('adaptive-control', 'value'),
+    State('run-complete-flag', 'data'),
+    State('session-id', 'data'),
+    State('url', 'search'),
+    background=True,
+    running=[
+        (Output('run-genetics', 'disabled'), True, False),
+        (Output('clear-solution-history', 'disabled'), True, False),
+        (Output('cancel-run', 'disabled'), False, True),
+        (Output('progress-interval', 'disabled'), False, True),
+    ],
+    cancel=[Input('cancel-run', 'n_clicks')],
     prevent_initial_call=True
 )
-def run_genetic_algorithm(n_clicks, clear_clicks, num_trucks, truck_capacity, truck_speed,
-                          population_size, generations, crossover_rate, mutation_rate, package_quantity):
+def run_genetic_algorithm(run_id, clear_clicks, num_trucks, truck_capacity, truck_speed,
+                          population_size, generations, crossover_rate, mutation_rate, package_quantity,
+                          stagnation_generations, time_budget, target_cost, diversity_floor, adaptive, completed_runs,
+                          session_id, search):
         if package_quantity > num_trucks * truck_capacity:
             return (
                 html.Div(
@@ -541,48 +594,99 @@ def run_genetic_algorithm(n_clicks, clear_clicks, num_trucks, truck_capacity, tr
                 no_update,
                 no_update,
                 no_update,
-                False
+                0,
+                ''
             )
-        global last_env_hash, best_solutions_memory
         ctx = callback_context
         if not ctx.triggered:
-            return no_update, no_update, no_update, no_update, False
+            return no_update, no_update, no_update, no_update, no_update, no_update
 
         trigger_id = ctx.triggered[0]['prop_id'].split('.')[0]
 
         if trigger_id == 'clear-solution-history':
-            best_solutions_memory.clear()
-            last_env_hash = None
-            return html.Div("Best solutions cleared."),0,0,0,False
+            solution_store.clear(session_id)
+            # bumping the flag rebuilds the charts and the solution payload from the emptied store
+            return html.Div("Best solutions cleared."),0,0,(completed_runs or 0) + 1,0,''
 
-        if n_clicks == 0:
-            return no_update, no_update, no_update, False
+        if not run_id or not session_id:
+            return no_update, no_update, no_update, no_update, no_update, no_update
 
         current_hash = compute_environment_hash(num_trucks, truck_capacity,truck_speed,package_quantity)
-
-        if current_hash != last_env_hash:
-            best_solutions_memory.clear()
-            last_env_hash = current_hash
+        previous_genomes = []
+        previous_hash, previous_solutions = solution_store.load(session_id)
+        if current_hash == previous_hash:
+            previous_genomes = [entry['genome'] for entry in previous_solutions]
+
+        # Report progress to the cache, throttled so fast generations don't spend their time writing
+        history = []
+        last_write = [0.0]
+        def report_progress(snapshot):
+            if not history or snapshot.best_cost < history[-1][1]:
+                history.append((snapshot.generation, snapshot.best_cost))
+            now = time.monotonic()
+            if now - last_write[0] < PROGRESS_WRITE_INTERVAL and snapshot.generation + 1 < generations:
+                return
+            last_write[0] = now
+            record_metrics(metrics.drain())
+            job_cache.set(progress_key(run_id), {
+                'generation': snapshot.generation + 1,
+                'generations': generations,
+                'best_cost': snapshot.best_cost,
+                'mean_cost': snapshot.mean_cost,
+                'diversity': snapshot.diversity,
+                'history': history
+            }, expire=PROGRESS_EXPIRE)
 
         # Run the algorithm
         packages = load_packages(package_quantity, d_matrix)
         best_cost = None
         matrices = get_matrices(truck_speed)
-        previous_genomes =  [entry['genome'] for entry in best_solutions_memory] if best_solutions_memory else []
-
-        _, best_cost = genetic_algorithm(
-            truck_count=num_trucks,
-            truck_capacity=truck_capacity,
-            truck_speed=truck_speed,
-            packages=packages,
-            matrices=matrices,
-            pop_size=population_size,
-            generations=generations,
-            crossover_rate=crossover_rate,
-            mutation_rate=mutation_rate,
-            best_solutions_out=best_solutions_memory,
-            seed_genomes=previous_genomes
-        )
+        best_solutions_memory = []
+        run_info = {}
+        metrics = RunMetrics()
+        fitness_pool = create_fitness_pool()
+
+        # run_id comes from the browser, the file name is made here so it can't point outside PROFILE_DIR
+        profiler = None
+        if profile_requested(search):
+            profiler = Profiler(profile_path(PROFILE_DIR, f'run-{uuid.uuid4().hex}'))
+        try:
+            # the run streams snapshots instead of printing every new best genome
+            with profiler or nullcontext():
+                for snapshot in genetic_algorithm_generations(
+                    truck_count=num_trucks,
+                    truck_capacity=truck_capacity,
+                    truck_speed=truck_speed,
+                    packages=packages,
+                    matrices=matrices,
+                    pop_size=population_size,
+                    generations=generations,
+                    crossover_rate=crossover_rate,
+                    mutation_rate=mutation_rate,
+                    best_solutions_out=best_solutions_memory,
+                    seed_genomes=previous_genomes,
+                    fitness_backend='numpy',
+                    representation='buffered',
+                    fitness_pool=fitness_pool,
+                    fitness_cache_size=4096,
+                    stagnation_generations=stagnation_generations,
+                    time_budget=time_budget,
+                    target_cost=target_cost,
+                    diversity_floor=diversity_floor,
+                    run_info_out=run_info,
+                    adaptive=bool(adaptive),
+                    metrics=metrics
+                ):
+                    report_progress(snapshot)
+                    best_cost = snapshot.best_cost
+        finally:
+            # the run process exits when the job is done, take its pool workers down with it
+            if fitness_pool is not None:
+                fitness_pool.shutdown()
+            record_metrics(metrics.drain())
+        record_metrics(metrics.drain(), {'best_cost': best_cost, 'generations': run_info['generations'],
+                                         'elapsed': run_info['elapsed']})
+        solution_store.save(session_id, current_hash, best_solutions_memory)
 
         # Collect results
         final_solution = best_solutions_memory[-1]['genome']
@@ -590,18 +694,35 @@ def run_genetic_algorithm(n_clicks, clear_clicks, num_trucks, truck_capacity, tr
         late_count = len(final_solution.late_packages)
         mileage = sum(truck.mileage for truck in final_solution.trucks)
         active_trucks = sum(1 for truck in final_solution.trucks if truck.packages)
+        # route sorting is part of evaluation, see model/metrics.py
+        phase_seconds = sorted(run_info['metrics']['seconds'].items(), key=lambda item: item[1], reverse=True)
+        phase_summary = ", ".join(f"{phase.replace('_', ' ')} {seconds:.2f}s"
+                                  for phase, seconds in phase_seconds if seconds >= 0.005)
+        profile_summary = []
+        if profiler is not None:
+            files = profiler.files()
+            profile_summary.append(html.P(f"Profile written to {files['pstats']} and {files['collapsed']}"))
+        adaptive_summary = []
+        if run_info.get('adaptive'):
+            last = run_info['adaptive'][-1]
+            adaptive_summary.append(html.P(f"Adaptive settings at the end: population {last['pop_size']}, "
+                                           f"crossover {last['crossover_rate']:.2f}, mutation {last['mutation_rate']:.3f}"))
 
         return(
             html.Div([
                 html.P(f"Best Total Cost: {best_cost:.2f}"),
                 html.P(f"Late Packages: {late_count}"),
                 html.P(f"Total Mileage: {mileage:.2f}"),
-                html.P(f"Trucks Used: {active_trucks}")
-            ]),
+                html.P(f"Trucks Used: {active_trucks}"),
+                html.P(f"Stopped: {STOP_REASON_TEXT[run_info['stop_reason']]} after {run_info['generations']} "
+                       f"generations ({run_info['elapsed']:.1f}s)"),
+                html.P(f"Time per phase: {phase_summary}")
+            ] + adaptive_summary + profile_summary),
             max(0,len(best_solutions_memory)-1), # slider max
             len(best_solutions_memory) - 1,
-            n_clicks, #makes the charts update
-            False #turn off loading
+            (completed_runs or 0) + 1, #makes the charts update
+            100,
+            f"Done ({run_info['stop_reason']}) - best cost {best_cost:.2f}"
         )
 
 def format_time(t):
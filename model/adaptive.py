@@ -0,0 +1,86 @@
+# Adaptive control of the operator rates and the population size for genetic_algorithm.
+# Every generation the controller looks at the population diversity (see model/convergence.py) and at how much
+# the best cost improved over the last window generations, then picks the settings for the next generation:
+#   - diversity below low_diversity raises the mutation rate, above high_diversity it decays back down
+#   - improving runs lean on crossover, stalled ones shift towards mutation
+#   - a converging population (stalled, diversity not high) shrinks so fewer evaluations go to near copies,
+#     a stalled but still diverse one grows back towards its starting size to search wider
+# Every decision is kept in log and printed when verbose.
+from collections import deque
+
+
+class AdaptiveController:
+    def __init__(self, pop_size, crossover_rate, mutation_rate, window=5, low_diversity=0.3, high_diversity=0.7,
+                 min_pop_size=None, min_improvement=0.001, crossover_bounds=(0.5, 1.0), mutation_bounds=(0.01, 0.5),
+                 verbose=True):
+        self.max_pop_size = pop_size
+        self.min_pop_size = min_pop_size if min_pop_size is not None else max(10, pop_size // 4)
+        self.pop_size = pop_size
+        self.crossover_rate = crossover_rate
+        self.mutation_rate = mutation_rate
+        self.window = window
+        self.low_diversity = low_diversity
+        self.high_diversity = high_diversity
+        self.min_improvement = min_improvement
+        self.crossover_bounds = crossover_bounds
+        self.mutation_bounds = mutation_bounds
+        self.history = deque(maxlen=window + 1)
+        self.log = []
+        self.verbose = verbose
+
+    # Relative drop of the best cost over the window, 0 until the window has filled
+    def improvement(self):
+        if len(self.history) <= self.window or self.history[0] in (0, float('inf')):
+            return 0.0
+        return (self.history[0] - self.history[-1]) / self.history[0]
+
+    # Settings for the next generation as (pop_size, crossover_rate, mutation_rate)
+    def update(self, generation, best_cost, diversity):
+        self.history.append(best_cost)
+        improvement = self.improvement()
+        improving = len(self.history) <= self.window or improvement >= self.min_improvement
+        reasons = []
+
+        if diversity < self.low_diversity:
+            self.mutation_rate *= 1.5
+            reasons.append('low diversity, mutation up')
+        elif diversity > self.high_diversity:
+            self.mutation_rate *= 0.9
+            reasons.append('high diversity, mutation down')
+
+        if improving:
+            self.crossover_rate += 0.02
+            self.mutation_rate *= 0.95
+            reasons.append('improving, crossover up')
+        else:
+            self.crossover_rate -= 0.05
+            self.mutation_rate *= 1.1
+            reasons.append('stalled, crossover down')
+
+        if not improving:
+            if diversity <= self.high_diversity:
+                self.pop_size = int(self.pop_size * 0.9)
+                reasons.append('converging, population down')
+            else:
+                self.pop_size = int(self.pop_size * 1.25)
+                reasons.append('stalled but diverse, population up')
+
+        self.crossover_rate = min(max(self.crossover_rate, self.crossover_bounds[0]), self.crossover_bounds[1])
+        self.mutation_rate = min(max(self.mutation_rate, self.mutation_bounds[0]), self.mutation_bounds[1])
+        self.pop_size = min(max(self.pop_size, self.min_pop_size), self.max_pop_size)
+
+        decision = {
+            'generation': generation,
+            'diversity': diversity,
+            'improvement': improvement,
+            'pop_size': self.pop_size,
+            'crossover_rate': self.crossover_rate,
+            'mutation_rate': self.mutation_rate,
+            'reason': ', '.join(reasons),
+        }
+        self.log.append(decision)
+        if self.verbose:
+            print(f"Generation {generation}: adaptive pop = {self.pop_size}, crossover = {self.crossover_rate:.2f}, "
+                  f"mutation = {self.mutation_rate:.3f} (diversity {diversity:.2f}, improvement {improvement:.4f}: "
+                  f"{decision['reason']})")
+        return self.pop_size, self.crossover_rate, self.mutation_rate
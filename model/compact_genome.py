@@ -0,0 +1,314 @@
+import datetime
+import hashlib
+import random
+import numpy as np
+from model import rng
+from model.permutation_crossover import permutation_child
+from model.vehicle import Vehicle
+
+
+# Array backed genome.  genes[:n] is a permutation of package table rows laid out truck after truck and
+# genes[n:] holds how many packages each truck carries.  Package metadata lives once in a shared
+# PackageTable, so copying a genome is a single array copy.
+class CompactGenome:
+    def __init__(self, table, truck_count, capacity, genes=None, departure_time=datetime.timedelta(hours=8)):
+        self.table = table
+        self.packages = table
+        self.truck_count = truck_count
+        self.capacity = capacity
+        self.package_count = len(table)
+        self.departure_time = departure_time
+        #stuff for output, filled in by evaluate_fitness
+        self.total_miles = 0
+        self.late_packages = []
+        #cached results per truck and per package position, trucks are only re-scored once marked dirty
+        self.mileage = np.zeros(truck_count)
+        self.truck_dirty = np.ones(truck_count, dtype=bool)
+        self.delivery_times = np.zeros(self.package_count, dtype=np.int64)
+        self.late_mask = np.zeros(self.package_count, dtype=bool)
+        if genes is None:
+            genes = np.zeros(self.package_count + truck_count, dtype=np.int32)
+            genes[:self.package_count] = np.arange(self.package_count)
+            self.genes = genes
+            self.distribute_packages()
+        else:
+            self.genes = genes
+
+    # Builds a compact genome over table from either genome type, used to carry seed genomes between runs
+    @staticmethod
+    def from_genome(genome, table, truck_count, capacity):
+        n = len(table)
+        genes = np.zeros(n + truck_count, dtype=np.int32)
+        if isinstance(genome, CompactGenome):
+            if genome.package_count != n or genome.truck_count != truck_count:
+                raise ValueError("Seed genome does not match the current trucks and packages!")
+            genes[:] = genome.genes
+        else:
+            routes = [truck.packages for truck in genome.trucks]
+            if len(routes) != truck_count or sum(len(r) for r in routes) != n:
+                raise ValueError("Seed genome does not match the current trucks and packages!")
+            genes[:n] = [table.row_of[pkg_id] for route in routes for pkg_id in route]
+            genes[n:] = [len(route) for route in routes]
+        return CompactGenome(table, truck_count, capacity, genes, genome.departure_time)
+
+    @property
+    def order(self):
+        return self.genes[:self.package_count]
+
+    @property
+    def loads(self):
+        return self.genes[self.package_count:]
+
+    @property
+    def package_list(self):
+        return self.table.keys()
+
+    def truck_bounds(self):
+        ends = np.cumsum(self.loads)
+        return ends - self.loads, ends
+
+    def make_copy(self):
+        genome = CompactGenome(self.table, self.truck_count, self.capacity, self.genes.copy(), self.departure_time)
+        genome.assign(self)
+        return genome
+
+    # Genome over caller owned arrays (rows of a PopulationBuffer).  Every method writes its arrays in place.
+    @staticmethod
+    def view(base_genome, genes, mileage, truck_dirty, delivery_times, late_mask):
+        genome = CompactGenome(base_genome.table, base_genome.truck_count, base_genome.capacity, genes,
+                               base_genome.departure_time)
+        genome.mileage = mileage
+        genome.truck_dirty = truck_dirty
+        genome.delivery_times = delivery_times
+        genome.late_mask = late_mask
+        return genome
+
+    # Overwrites genes and cached results with other's, in place
+    def assign(self, other):
+        self.genes[:] = other.genes
+        self.mileage[:] = other.mileage
+        self.truck_dirty[:] = other.truck_dirty
+        self.delivery_times[:] = other.delivery_times
+        self.late_mask[:] = other.late_mask
+        self.late_packages = other.late_packages
+        self.total_miles = other.total_miles
+
+    # Index of the truck holding each of positions
+    def trucks_at(self, positions):
+        return np.searchsorted(np.cumsum(self.loads), positions, side='right')
+
+    # Digest of the genes, equal keys score the same
+    def fitness_key(self):
+        return hashlib.blake2b(self.genes.tobytes(), digest_size=16).digest()
+
+    # Everything evaluate_fitness writes onto the genome, so a cached result can be restored onto a clone
+    def result_state(self):
+        return (self.genes.copy(), self.mileage.copy(), self.delivery_times.copy(), self.late_mask.copy(),
+                self.late_packages, self.total_miles)
+
+    def load_result_state(self, state):
+        genes, mileage, delivery_times, late_mask, self.late_packages, self.total_miles = state
+        self.genes[:] = genes
+        self.mileage[:] = mileage
+        self.delivery_times[:] = delivery_times
+        self.late_mask[:] = late_mask
+        self.truck_dirty[:] = False
+
+    # Package ids per truck
+    def truck_routes(self):
+        ids = self.table.ids[self.order]
+        _, ends = self.truck_bounds()
+        return [route.tolist() for route in np.split(ids, ends[:-1])]
+
+    # Vehicle view of the genome for display code, built on demand
+    @property
+    def trucks(self):
+        starts, ends = self.truck_bounds()
+        trucks = []
+        for t, route in enumerate(self.truck_routes()):
+            truck = Vehicle(self.capacity, None, route, float(self.mileage[t]), 0, self.departure_time)
+            truck.dirty = bool(self.truck_dirty[t])
+            if not truck.dirty:
+                times = self.delivery_times[starts[t]:ends[t]].tolist()
+                truck.delivery_log = [
+                    (pkg_id, datetime.timedelta(microseconds=time)) for pkg_id, time in zip(route, times)
+                ]
+            trucks.append(truck)
+        return trucks
+
+    def distribute_packages(self):
+        if self.truck_count * self.capacity < self.package_count:
+            raise ValueError("Not enough capacity to assign all packages!")
+        full, rest = divmod(self.package_count, self.capacity)
+        self.loads[:] = 0
+        self.loads[:full] = self.capacity
+        if rest:
+            self.loads[full] = rest
+        self.truck_dirty[:] = True
+
+    def fill_randomly(self):
+        n = self.package_count
+        if self.truck_count * self.capacity < n:
+            raise ValueError("Not enough capacity to assign all packages!")
+        # Pick n of the free truck slots at random, which spreads packages the same way a random
+        # choice of truck with room per package does
+        slots = np.repeat(np.arange(self.truck_count), self.capacity)
+        chosen = slots[rng.generator.choice(len(slots), n, replace=False)]
+        self.order[:] = rng.generator.permutation(n)
+        self.loads[:] = np.bincount(chosen, minlength=self.truck_count)
+        self.truck_dirty[:] = True
+        self.sort_genome()
+
+    #Same ordering as Genome.sort_genome: more loaded trucks up top, then by first package
+    def sort_genome(self):
+        n = self.package_count
+        loads = self.loads.copy()
+        starts, ends = self.truck_bounds()
+        first = np.where(loads > 0, self.genes[np.minimum(starts, n - 1)], np.iinfo(np.int32).max)
+        truck_order = np.lexsort((first, -loads))
+        if (truck_order == np.arange(self.truck_count)).all():
+            return
+        # cached results move with their trucks
+        source = np.concatenate([np.arange(starts[t], ends[t]) for t in truck_order])
+        self.order[:] = self.order[source]
+        self.delivery_times[:] = self.delivery_times[source]
+        self.late_mask[:] = self.late_mask[source]
+        self.loads[:] = loads[truck_order]
+        self.mileage[:] = self.mileage[truck_order]
+        self.truck_dirty[:] = self.truck_dirty[truck_order]
+
+    def swap_positions(self, pos1, pos2):
+        self.order[pos1], self.order[pos2] = self.order[pos2], self.order[pos1]
+        self.truck_dirty[self.trucks_at([pos1, pos2])] = True
+
+    # Cascading consolidation: push packages up as far as possible to clear out the excess trucks.
+    # Trucks are contiguous, so moving packages up is a boundary shift after shuffling which ones go.
+    def consolidate(self):
+        loads = self.loads
+        for i in range(self.truck_count - 1, 0, -1):
+            if loads[i] == 0:
+                continue
+            space_remaining = self.capacity - loads[i - 1]
+            if space_remaining <= 0:
+                continue
+            if space_remaining < loads[i]:
+                start = int(loads[:i].sum())
+                rng.generator.shuffle(self.order[start:start + loads[i]])
+            num_to_move = min(space_remaining, loads[i])
+            loads[i - 1] += num_to_move
+            loads[i] -= num_to_move
+            self.truck_dirty[i - 1] = self.truck_dirty[i] = True
+
+    # Keeps the trucks in keep as they are and spreads every other package randomly over the free capacity
+    # of all trucks.  Linear in packages + total capacity.
+    def redistribute(self, keep):
+        n = self.package_count
+        loads = self.loads.astype(np.int64)
+        starts, _ = self.truck_bounds()
+        kept = np.zeros(self.truck_count, dtype=bool)
+        kept[keep] = True
+
+        position_truck = np.repeat(np.arange(self.truck_count), loads)
+        keep_mask = kept[position_truck]
+        remaining = self.order[~keep_mask]
+        rng.generator.shuffle(remaining)
+
+        base = np.where(kept, loads, 0)
+        slots = np.repeat(np.arange(self.truck_count), self.capacity - base)
+        if len(slots) < len(remaining):
+            raise ValueError("Not enough truck capacity to place all packages during crossover! Please add trucks or capacity to this query.")
+        picked = np.sort(slots[rng.generator.choice(len(slots), len(remaining), replace=False)])
+        extra = np.bincount(picked, minlength=self.truck_count)
+
+        new_loads = base + extra
+        new_starts = np.cumsum(new_loads) - new_loads
+        new_order = np.empty(n, dtype=self.genes.dtype)
+
+        kept_trucks = position_truck[keep_mask]
+        kept_offset = np.nonzero(keep_mask)[0] - starts[kept_trucks]
+        new_order[new_starts[kept_trucks] + kept_offset] = self.order[keep_mask]
+
+        rank = np.arange(len(picked)) - np.repeat(np.cumsum(extra) - extra, extra)
+        new_order[new_starts[picked] + base[picked] + rank] = remaining
+
+        # kept trucks that gained nothing keep their cached results, at their new positions
+        new_delivery_times = np.zeros(n, dtype=np.int64)
+        new_late_mask = np.zeros(n, dtype=bool)
+        kept_destination = new_starts[kept_trucks] + kept_offset
+        new_delivery_times[kept_destination] = self.delivery_times[keep_mask]
+        new_late_mask[kept_destination] = self.late_mask[keep_mask]
+        self.truck_dirty |= ~kept | (extra > 0)
+
+        self.order[:] = new_order
+        self.loads[:] = new_loads
+        self.delivery_times[:] = new_delivery_times
+        self.late_mask[:] = new_late_mask
+
+    def __str__(self):
+        output = "Truck Route Assignments:\n"
+        for i, route in enumerate(self.truck_routes()):
+            output += f"Truck {i + 1}: {route}\n"
+        return output
+
+
+# Compact counterpart of genetic_algorithm.crossover: each child keeps a random half of its parent's trucks
+# and redistributes the rest.  With children_out (genomes over preallocated rows) the children are written
+# into those instead of new copies.
+# method 'trucks' is that truck-half crossover, 'ox' / 'pmx' / 'erx' recombine the giant tours instead,
+# see model/permutation_crossover.py
+def crossover_compact(parents, crossover_rate, children_out=None, method='trucks'):
+    offspring = []
+
+    for i in range(0, len(parents), 2):
+        if i + 1 >= len(parents):
+            break
+
+        parent1 = parents[i]
+        parent2 = parents[i + 1]
+        if children_out is None:
+            child1 = parent1.make_copy()
+            child2 = parent2.make_copy()
+        else:
+            child1 = children_out[i]
+            child2 = children_out[i + 1]
+            child1.assign(parent1)
+            child2.assign(parent2)
+
+        if random.random() < crossover_rate:
+            if method == 'trucks':
+                truck_indices = list(range(parent1.truck_count))
+                random.shuffle(truck_indices)
+                half = len(truck_indices) // 2
+
+                child1.redistribute(truck_indices[:half])
+                child2.redistribute(truck_indices[:half])
+            else:
+                permutation_child(child1, parent1, parent2, method, rng.generator)
+                permutation_child(child2, parent2, parent1, method, rng.generator)
+            child1.sort_genome()
+            child2.sort_genome()
+
+        offspring.append(child1)
+        offspring.append(child2)
+
+    return offspring
+
+
+# Compact counterpart of genetic_algorithm.mutation, in_place mutates the offspring instead of copies
+def mutation_compact(offspring, mutation_rate, in_place=False):
+    mutated = []
+
+    for g in offspring:
+        genome = g if in_place else g.make_copy()
+
+        if random.random() < mutation_rate:
+            if random.random() < 0.02:
+                genome.consolidate()
+
+            # Standard mutation: swap two packages
+            if genome.package_count >= 2:
+                pos1, pos2 = random.sample(range(genome.package_count), 2)
+                genome.swap_positions(pos1, pos2)
+        genome.sort_genome()
+        mutated.append(genome)
+    return mutated
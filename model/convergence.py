@@ -0,0 +1,56 @@
+# Early termination for genetic_algorithm.  A run stops before its last generation when any criterion is met:
+#   'stagnation'  - the best cost hasn't improved for stagnation_generations generations
+#   'time_budget' - time_budget seconds of wall-clock time have passed
+#   'target_cost' - the best cost is at or below target_cost
+#   'diversity'   - fewer than diversity_floor of the population have distinct costs
+# Criteria left at None are off.  A run that goes the distance reports 'generations', one its consumer stopped
+# reports 'stopped' (see genetic_algorithm_generations).
+import time
+
+STOP_REASONS = ('generations', 'stagnation', 'time_budget', 'target_cost', 'diversity', 'stopped')
+
+
+# Fraction of the scored population with distinct total costs, 1.0 when every genome differs
+def population_diversity(population_fitness):
+    if not population_fitness:
+        return 0.0
+    return len({round(entry[2], 6) for entry in population_fitness}) / len(population_fitness)
+
+
+class StoppingCriteria:
+    def __init__(self, stagnation_generations=None, time_budget=None, target_cost=None, diversity_floor=None):
+        self.stagnation_generations = stagnation_generations
+        self.time_budget = time_budget
+        self.target_cost = target_cost
+        self.diversity_floor = diversity_floor
+        self.start_time = time.monotonic()
+        self.best_cost = float('inf')
+        self.best_generation = 0
+
+    def elapsed(self):
+        return time.monotonic() - self.start_time
+
+    # Called after every scored generation (or migration epoch) with the best cost so far and the population
+    # diversity (None when it isn't known).  Returns the stop reason, or None to carry on.
+    def check(self, generation, best_cost, diversity=None):
+        if best_cost < self.best_cost:
+            self.best_cost = best_cost
+            self.best_generation = generation
+        if self.target_cost is not None and best_cost <= self.target_cost:
+            return 'target_cost'
+        if self.stagnation_generations is not None and generation - self.best_generation >= self.stagnation_generations:
+            return 'stagnation'
+        if self.diversity_floor is not None and diversity is not None and diversity < self.diversity_floor:
+            return 'diversity'
+        if self.time_budget is not None and self.elapsed() >= self.time_budget:
+            return 'time_budget'
+        return None
+
+    # What run_info_out gets filled with
+    def summary(self, stop_reason, generations_run):
+        return {
+            'stop_reason': stop_reason,
+            'generations': generations_run,
+            'best_generation': self.best_generation,
+            'elapsed': self.elapsed(),
+        }
@@ -0,0 +1,4 @@
+# The cost every scorer minimises: mileage (the drive back to the hub included) + LATE_COST per late package
+# + TRUCK_COST per truck that leaves the hub.  Fitness is 1 / (cost + 1).
+TRUCK_COST = 20.0
+LATE_COST = 20.0
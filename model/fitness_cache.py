@@ -0,0 +1,74 @@
+from collections import OrderedDict
+
+
+# Bounded LRU cache in front of a population scorer.
+# Elites and unchanged clones come back every generation with the same routes, so their results are restored
+# from the cache instead of being scored again.  Genomes are keyed by fitness_key(), a digest of their routes.
+# rescore_stable says a scored genome scores the same again, so its result can also be stored under its new key.
+class FitnessCache:
+    def __init__(self, score_population, max_size=4096, rescore_stable=True):
+        self.score_population = score_population
+        self.max_size = max_size
+        self.rescore_stable = rescore_stable
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        #stats for the last scored generation
+        self.generation_hits = 0
+        self.generation_misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def store(self, key, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    # Same contract as evaluate_fitness: returns (genome, fitness, cost) sorted best first
+    def __call__(self, population):
+        keys = [genome.fitness_key() for genome in population]
+        results = [None] * len(population)
+        pending = {}
+
+        for i, key in enumerate(keys):
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                results[i] = entry
+            elif key in pending:
+                pending[key].append(i)
+            else:
+                pending[key] = [i]
+
+        self.generation_hits = len(population) - len(pending)
+        self.generation_misses = len(pending)
+        self.hits += self.generation_hits
+        self.misses += self.generation_misses
+
+        scored_fresh = set()
+        if pending:
+            position = {id(population[indices[0]]): indices[0] for indices in pending.values()}
+            scored = self.score_population([population[indices[0]] for indices in pending.values()])
+            for genome, fitness, cost in scored:
+                entry = (genome.result_state(), fitness, cost)
+                # scoring sorts the routes, the sorted genome scores the same so it is stored under both keys
+                if self.rescore_stable:
+                    self.store(genome.fitness_key(), entry)
+                results[position[id(genome)]] = entry
+                scored_fresh.add(position[id(genome)])
+
+            for key, indices in pending.items():
+                entry = results[indices[0]]
+                self.store(key, entry)
+                for i in indices[1:]:
+                    results[i] = entry
+
+        fitness_scores = []
+        for i, (genome, (state, fitness, cost)) in enumerate(zip(population, results)):
+            if i not in scored_fresh:
+                genome.load_result_state(state)
+            fitness_scores.append((genome, fitness, cost))
+        fitness_scores.sort(key=lambda x: x[1], reverse=True)
+        return fitness_scores
@@ -0,0 +1,71 @@
+# Persistent process pool for the array fitness engine.
+# Workers are started with a copy of the engine (distance/time matrices and package arrays) once, so each
+# generation only ships route chunks.  The pool is kept alive between runs and restarted only when a run
+# needs different data.
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+#engine held by each worker process, set by the pool initializer
+worker_engine = None
+
+
+def init_worker(engine):
+    global worker_engine
+    #forked workers inherit the parent's engine object, make sure they score in process
+    engine.pool = None
+    worker_engine = engine
+
+
+def score_chunk(routes, lengths):
+    return worker_engine.score_routes(routes, lengths)
+
+
+# Identifies the data an engine was built from and how it routes, so runs on the same data with the same
+# route builder reuse the running workers.  Workers route with their own copy of the builder.
+def engine_fingerprint(engine):
+    digest = hashlib.sha1()
+    for array in (engine.pkg_address, engine.pkg_due, engine.d_matrix, engine.t_matrix):
+        digest.update(np.ascontiguousarray(array).tobytes())
+    digest.update(str(engine.departure_time).encode())
+    builder = engine.route_builder
+    if builder is not None:
+        digest.update(f"{builder.method}-{builder.max_passes}-{builder.window}".encode())
+    return digest.hexdigest()
+
+
+class FitnessPool:
+    # min_rows: batches with fewer routes than this are scored in process, the hand off costs more than it saves
+    def __init__(self, workers=None, chunks_per_worker=2, min_rows=2048):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunks_per_worker = chunks_per_worker
+        self.min_rows = min_rows
+        self.executor = None
+        self.fingerprint = None
+
+    # Points engine at this pool, (re)starting the workers if they hold different data
+    def attach(self, engine):
+        fingerprint = engine_fingerprint(engine)
+        if self.executor is None or fingerprint != self.fingerprint:
+            self.shutdown()
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker, initargs=(engine,))
+            self.fingerprint = fingerprint
+        engine.pool = self
+        return engine
+
+    def score_routes(self, routes, lengths):
+        chunk_count = min(len(routes), self.workers * self.chunks_per_worker)
+        bounds = np.linspace(0, len(routes), chunk_count + 1).astype(int)
+        futures = [
+            self.executor.submit(score_chunk, routes[start:end], lengths[start:end])
+            for start, end in zip(bounds[:-1], bounds[1:])
+        ]
+        results = [future.result() for future in futures]
+        return tuple(np.concatenate(parts) for parts in zip(*results))
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+            self.fingerprint = None
@@ -1,7 +1,25 @@
 # Genetic Algorithm for Vehicle Routing Optimization
 import random
+from contextlib import nullcontext
+import numpy as np
 from model.vehicle import Vehicle
 from model.genome import Genome
+from model.vectorized_fitness import NumpyFitness
+from model.package_table import PackageTable
+from model.compact_genome import CompactGenome, crossover_compact, mutation_compact
+from model import rng
+from model.fitness_cache import FitnessCache
+from model.routing import RouteBuilder
+from model.population_buffer import PopulationBuffer
+from model.selection import select_indices
+from model.permutation_crossover import PERMUTATION_CROSSOVERS
+from model.local_search import LocalSearch
+from model.convergence import StoppingCriteria, population_diversity
+from model.adaptive import AdaptiveController
+from model.streaming import GenerationSnapshot
+from model.metrics import RunMetrics, timed
+from model.profiling import Profiler
+from model.costs import LATE_COST, TRUCK_COST
 random.seed("WGUPS")
 
 
@@ -27,26 +45,44 @@ def create_initial_population(pop_size, base_genome,seed_genomes=None):
     return population
 
 # Evaluate fitness of the population
-def evaluate_fitness(population, matrices):
+# With a FitnessPool the array engine splits the population into chunks scored by the pool's workers.
+# A RouteBuilder replaces the nearest neighbour scan used to order each truck's packages.
+# A RunMetrics (model/metrics.py) gets the time spent sorting routes.
+def evaluate_fitness(population, matrices, pool=None, route_builder=None, metrics=None):
+    # Compact genomes are scored by the array engine
+    if population and isinstance(population[0], CompactGenome):
+        engine = NumpyFitness.from_table(population[0].table, matrices, population[0].departure_time)
+        engine.route_builder = route_builder
+        engine.metrics = metrics
+        if pool is not None:
+            pool.attach(engine)
+        return engine.evaluate_compact(population)
+    if population and pool is not None:
+        engine = NumpyFitness.from_packages(population[0].packages, matrices, population[0].departure_time)
+        engine.route_builder = route_builder
+        engine.metrics = metrics
+        return pool.attach(engine).evaluate(population)
+
     fitness_scores = []
     d_matrix, t_matrix = matrices
 
     for genome in population:
-        genome.sort_truck_routes_by_location(d_matrix)
-        for pkg_id in genome.package_list:
-            pkg = genome.packages.get(pkg_id)
-            pkg.time_delivered = None
+        # Only trucks whose route changed since they were last scored are re-routed and re-costed,
+        # the rest reuse their cached mileage, delivery log and late packages
+        with timed(metrics, 'route_sorting'):
+            genome.sort_truck_routes_by_location(d_matrix, route_builder)
         genome.late_packages = []
         # Calculate distance for each truck's route
-        for pkg_id in genome.package_list:
-            pkg = genome.packages.get(pkg_id)
-            pkg.time_delivered = None
         for truck in genome.trucks:
+            if not truck.dirty:
+                genome.late_packages.extend(truck.late_packages)
+                continue
             truck.mileage = 0.0
             truck.time = genome.departure_time
             truck.departure_time = genome.departure_time
             truck.address = 0
             truck.delivery_log = []#to hold deliveries for Dash
+            truck.late_packages = []
             for idx, package_id in enumerate(truck.packages):
                 #if the vehicle is empty it goes to the station to refill if there are more packages
                 #if idx % truck.capacity == 0 and idx != 0:
@@ -63,15 +99,16 @@ def evaluate_fitness(population, matrices):
                 truck.time += t_matrix[truck.address][next_address]
                 truck.address = next_address
 
-                pkg.time_delivered = truck.time
                 truck.delivery_log.append((package_id, truck.time))
                 if not pkg.ontime(truck.time):
-                    genome.late_packages.append(package_id)
+                    truck.late_packages.append(package_id)
 
             #return to hub at the end of the day
             if truck.address != 0:
                 truck.mileage += d_matrix[truck.address][0]
                 truck.time += t_matrix[truck.address][0]
+            truck.dirty = False
+            genome.late_packages.extend(truck.late_packages)
 
         active_trucks = 0
         genome.total_miles = 0
@@ -79,7 +116,7 @@ def evaluate_fitness(population, matrices):
             if len(truck.packages) > 0:
                 active_trucks += 1
                 genome.total_miles += truck.mileage
-        total_cost = genome.total_miles + len(genome.late_packages) * 20.0 + active_trucks * 20
+        total_cost = genome.total_miles + len(genome.late_packages) * LATE_COST + active_trucks * TRUCK_COST
 
         # Fitness is inversely proportional to total cost.
         fitness = 1.0 / (total_cost + 1)
@@ -90,13 +127,19 @@ def evaluate_fitness(population, matrices):
     return fitness_scores
 
 # Selection function
-def selection(population_fitness, num_parents):
+# method picks a batched selection engine from model/selection.py ('tournament', 'rank' or 'sus'),
+# None keeps the original one tournament at a time selection.
+def selection(population_fitness, num_parents, method=None, tournament_size=5):
+    if method is not None:
+        fitness = np.fromiter((entry[1] for entry in population_fitness), dtype=np.float64, count=len(population_fitness))
+        return [population_fitness[i][0] for i in select_indices(fitness, num_parents, method, tournament_size).tolist()]
+
     # Tournament selection
     selected_parents = []
 
     for _ in range(num_parents):
         # Select random competitors
-        tournament_size = min(5, len(population_fitness))
+        tournament_size = min(tournament_size, len(population_fitness))
         competitors = random.sample(population_fitness, tournament_size)
 
         # Select the best competitor and add them to the selected parents
@@ -106,7 +149,13 @@ def selection(population_fitness, num_parents):
     return selected_parents
 
 # Crossover function
-def crossover(parents, crossover_rate):
+# method 'trucks' keeps half of each parent's trucks, the giant tour operators in PERMUTATION_CROSSOVERS
+# need compact genomes
+def crossover(parents, crossover_rate, method='trucks'):
+    if parents and isinstance(parents[0], CompactGenome):
+        return crossover_compact(parents, crossover_rate, method=method)
+    if method != 'trucks':
+        raise ValueError(f"Crossover method {method} needs the compact or buffered representation")
     offspring = []
 
     for i in range(0, len(parents), 2):
@@ -123,8 +172,10 @@ def crossover(parents, crossover_rate):
             # Step 1: Clear child truck routes
             for truck in child1.trucks:
                 truck.packages = []
+                truck.dirty = True
             for truck in child2.trucks:
                 truck.packages = []
+                truck.dirty = True
 
             assigned1 = set()
             assigned2 = set()
@@ -134,11 +185,14 @@ def crossover(parents, crossover_rate):
             random.shuffle(truck_indices)
             half = len(truck_indices) // 2
 
+            # The children are copies of their parents, so a kept truck still holds valid cached results
             for idx in truck_indices[:half]:
                 child1.trucks[idx].packages = list(parent1.trucks[idx].packages)
+                child1.trucks[idx].dirty = parent1.trucks[idx].dirty
                 assigned1.update(parent1.trucks[idx].packages)
 
                 child2.trucks[idx].packages = list(parent2.trucks[idx].packages)
+                child2.trucks[idx].dirty = parent2.trucks[idx].dirty
                 assigned2.update(parent2.trucks[idx].packages)
 
             # Step 3: Assign missing packages to remaining trucks
@@ -172,11 +226,14 @@ def fill_remaining_packages(trucks, remaining_packages):
             raise ValueError("Not enough truck capacity to place all packages during crossover! Please add trucks or capacity to this query.")
         choice = random.choice(valid_trucks)
         trucks[choice].packages.append(pkg)
+        trucks[choice].dirty = True
         truck_loads[choice] += 1
 
 
 # Mutation function
 def mutation(offspring, mutation_rate):
+    if offspring and isinstance(offspring[0], CompactGenome):
+        return mutation_compact(offspring, mutation_rate)
     mutated = []
 
     for g in offspring:
@@ -199,6 +256,7 @@ def mutation(offspring, mutation_rate):
                         if space_remaining >= len(lower.packages):
                             upper.packages.extend(lower.packages)
                             lower.packages.clear()
+                            upper.dirty = lower.dirty = True
                         else:
                             # Try moving only as many as fit
                             num_to_move = min(space_remaining, len(lower.packages))
@@ -207,6 +265,7 @@ def mutation(offspring, mutation_rate):
                                 for pkg in selected:
                                     lower.packages.remove(pkg)
                                     upper.packages.append(pkg)
+                                upper.dirty = lower.dirty = True
 
             # Standard mutation: swap two packages
             pkg_ids = list(genome.package_list)
@@ -218,58 +277,332 @@ def mutation(offspring, mutation_rate):
     return mutated
 
 
+# Builds the empty genome every member of the population is copied from.  Seed genomes are converted
+# to the same representation.  Returns (base genome, seed genomes).
+def create_base_genome(truck_count, truck_capacity, truck_speed, packages, representation, seed_genomes=None):
+    if truck_count * truck_capacity < len(packages):
+        raise ValueError("Not enough capacity to assign all packages!")
+    if seed_genomes is None:
+        seed_genomes = []
+    if representation in ('compact', 'buffered', 'giant'):
+        table = PackageTable(packages)
+        genome = CompactGenome(table, truck_count, truck_capacity)
+        seed_genomes = [CompactGenome.from_genome(seed, table, truck_count, truck_capacity) for seed in seed_genomes]
+    elif representation == 'vehicles':
+        trucks = []
+        for i in range(truck_count):
+             trucks.append(Vehicle(truck_capacity, truck_speed, [], 0, 0))
+        genome = Genome(trucks, packages)
+    else:
+        raise ValueError(f"Unknown genome representation: {representation}")
+    return genome, seed_genomes
+
+# Fills truck delivery logs for a genome scored by a batched backend, keeping its routes as they are
+def fill_delivery_logs(genome, matrices):
+    _, t_matrix = matrices
+    for truck in genome.trucks:
+        time = genome.departure_time
+        address = 0
+        truck.delivery_log = []
+        for package_id in truck.packages:
+            next_address = genome.packages.get(package_id).address
+            time += t_matrix[address][next_address]
+            address = next_address
+            truck.delivery_log.append((package_id, time))
+
+# Returns a function that scores a whole population the way evaluate_fitness does.
+# A fitness_pool spreads the array engine over worker processes, it has no effect on the python backend.
+# routing picks the route construction engine for the python backend (the array engines always use their
+# own vectorized nearest neighbour) and route_passes > 0 adds that many 2-opt / Or-opt passes, see model/routing.py
+# giant_tour scores CompactGenomes as giant tours, re-splitting their loads optimally (model/split.py), routing='keep'
+# then delivers each truck in tour order so the split's costs are exact, anything else re-routes it by nearest neighbour
+# metrics is an optional RunMetrics (model/metrics.py) that gets the time spent sorting routes
+def create_scorer(base_genome, packages, matrices, fitness_backend, fitness_pool=None, routing='indexed', route_passes=0,
+                  giant_tour=False, metrics=None):
+    if giant_tour:
+        engine = NumpyFitness.from_table(base_genome.table, matrices, base_genome.departure_time)
+        # trucks are routed by nearest neighbour after the split, routing='keep' delivers them in tour order
+        engine.route_builder = RouteBuilder.from_engine(engine, 'keep' if routing == 'keep' else 'vectorized', route_passes)
+        engine.metrics = metrics
+        if fitness_pool is not None:
+            fitness_pool.attach(engine)
+        return engine.evaluate_giant
+    if isinstance(base_genome, CompactGenome):
+        engine = NumpyFitness.from_table(base_genome.table, matrices, base_genome.departure_time)
+        score = engine.evaluate_compact
+    elif fitness_backend == 'python':
+        if routing == 'scan' and not route_passes:
+            return lambda pop: evaluate_fitness(pop, matrices, metrics=metrics)
+        engine = NumpyFitness.from_packages(packages, matrices, base_genome.departure_time)
+        route_builder = RouteBuilder.from_engine(engine, routing, route_passes)
+        return lambda pop: evaluate_fitness(pop, matrices, route_builder=route_builder, metrics=metrics)
+    elif fitness_backend == 'numpy':
+        engine = NumpyFitness.from_packages(packages, matrices, base_genome.departure_time)
+        score = engine.evaluate
+    else:
+        raise ValueError(f"Unknown fitness backend: {fitness_backend}")
+    engine.metrics = metrics
+    if route_passes:
+        engine.route_builder = RouteBuilder.from_engine(engine, 'vectorized', route_passes)
+    if fitness_pool is not None:
+        fitness_pool.attach(engine)
+    return score
+
+# Returns the memetic stage for a run, a LocalSearch (model/local_search.py) over the same package keys as the
+# genomes.  Improved genomes are re-scored with their routes kept as the search left them.
+def create_local_search(base_genome, packages, matrices, top_k, time_budget, neighbours, move_budget=None):
+    if isinstance(base_genome, CompactGenome):
+        engine = NumpyFitness.from_table(base_genome.table, matrices, base_genome.departure_time)
+        engine.route_builder = RouteBuilder.from_engine(engine, 'keep')
+        return LocalSearch(engine, range(base_genome.package_count), base_genome.capacity, engine.evaluate_compact,
+                           top_k, time_budget, neighbours, move_budget)
+    engine = NumpyFitness.from_packages(packages, matrices, base_genome.departure_time)
+    route_builder = RouteBuilder.from_engine(engine, 'keep')
+    return LocalSearch(engine, packages.keys(), base_genome.trucks[0].capacity,
+                       lambda pop: evaluate_fitness(pop, matrices, route_builder=route_builder),
+                       top_k, time_budget, neighbours, move_budget)
+
+# Select parents based on fitness score for the population, reproductive success rate (which is really it's
+# inverse here) determines how many parents are selected from the total population.
+def parent_count(pop_size):
+    reproductive_success_rate = 2
+    return pop_size // reproductive_success_rate
+
+# Elitism keeps the best (pop_size / survival_rate) solutions
+def elite_count(pop_size):
+    survival_rate = 10
+    return max(5,pop_size//survival_rate)
+
+# Rows a PopulationBuffer needs: the initial population, or the elites plus every child bred from the parents
+def buffer_rows(pop_size):
+    return max(pop_size, elite_count(pop_size) + 2 * (parent_count(pop_size) // 2))
+
+# Breeds the next population from a scored one.
+# With a PopulationBuffer the elites and children are written into its free half in place and returned as views.
+# A RunMetrics (model/metrics.py) gets the time spent in each step.
+def next_generation(population_fitness, pop_size, crossover_rate, mutation_rate, buffer=None, selection_method=None,
+                    tournament_size=5, crossover_method='trucks', metrics=None):
+    with timed(metrics, 'selection'):
+        parents = selection(population_fitness, parent_count(pop_size), selection_method, tournament_size)
+    kept = elite_count(pop_size)
+    elites = [e[0] for e in population_fitness[:kept]]
+
+    if buffer is not None:
+        children = buffer.children()
+        with timed(metrics, 'elitism'):
+            for view, elite in zip(children, elites):
+                view.assign(elite)
+        with timed(metrics, 'crossover'):
+            offspring = crossover_compact(parents, crossover_rate, children_out=children[len(elites):],
+                                          method=crossover_method)
+        with timed(metrics, 'mutation'):
+            offspring = mutation_compact(offspring, mutation_rate, in_place=True)
+        buffer.swap()
+        return children[:len(elites)] + offspring[:(pop_size-kept)]
+
+    # Crossover
+    with timed(metrics, 'crossover'):
+        offspring = crossover(parents, crossover_rate, crossover_method)
+
+    # Mutation
+    with timed(metrics, 'mutation'):
+        offspring = mutation(offspring, mutation_rate)
+
+    # Create new population with elitism
+    with timed(metrics, 'elitism'):
+        population = elites + offspring[:(pop_size-kept)]
+    return population
+
+
 # Genetic algorithm
-def genetic_algorithm(truck_count, truck_capacity, truck_speed, packages, matrices, pop_size=50, generations=100, crossover_rate=0.9, mutation_rate=0.2,best_solutions_out=None,seed_genomes=None):
+# fitness_backend picks how the population is scored: 'python' walks each genome, 'numpy' scores the whole
+# population in batched array operations.  Both produce the same costs.
+# representation picks the genome type: 'vehicles' for Genome objects, 'compact' for array backed
+# CompactGenomes sharing one PackageTable (always scored by the array engine), 'buffered' for CompactGenomes
+# bred in place in a double-buffered PopulationBuffer (model/population_buffer.py), same results as 'compact'.
+# 'giant' breeds buffered CompactGenomes as giant tours: only the package order evolves, each scoring splits it
+# into the cheapest capacity respecting truck loads (model/split.py) before routing the trucks, see create_scorer.
+# The giant tour crossovers ('ox', 'pmx', 'erx') suit it best.
+# islands > 1 runs that many sub-populations in worker processes, see model/islands.py
+# fitness_pool is a FitnessPool (model/fitness_pool.py) that scores each generation in chunks on its workers
+# fitness_cache_size > 0 keeps that many results in an LRU cache so unchanged genomes aren't scored again
+# routing / route_passes pick the route construction engine, see create_scorer
+# on_generation(generation, best_cost) is called after every scored generation, used to report progress
+# selection_method / tournament_size pick the parent selection, see selection
+# crossover_method is 'trucks' or one of the giant tour operators ('ox', 'pmx', 'erx'), see crossover
+# local_search_top_k > 0 adds a memetic stage: every generation the best local_search_top_k genomes get
+# local_search_budget seconds of local search between them, moving packages towards their
+# local_search_neighbours nearest addresses, see model/local_search.py.  The seconds run out at a different point
+# on every run, so time bounded local search makes seeded runs non-reproducible.  local_search_moves caps the
+# moves tried per generation instead of the time, which keeps them reproducible.
+# stagnation_generations / time_budget (seconds) / target_cost / diversity_floor stop the run early, see
+# model/convergence.py.  run_info_out is filled with the stop reason, generations run and elapsed time.
+# adaptive=True lets an AdaptiveController (model/adaptive.py) retune crossover_rate, mutation_rate and the
+# population size every generation, from pop_size downwards.  Its decisions go to run_info_out['adaptive'].
+# run_info_out['metrics'] gets the wall time and calls of every phase plus the evaluation and cache counters, for
+# the whole run and per generation, see model/metrics.py
+# verbose=False leaves out the per generation printing (new best genomes, cache stats, controller decisions).
+# profile is a path (without extension) to profile the run to, see model/profiling.py.  The files written go to
+# run_info_out['profile'].  Island runs only profile the parent process.
+# genetic_algorithm_generations runs the same loop as a generator of per generation snapshots.
+def genetic_algorithm(truck_count, truck_capacity, truck_speed, packages, matrices, pop_size=50, generations=100, crossover_rate=0.9, mutation_rate=0.2,best_solutions_out=None,seed_genomes=None,fitness_backend='python',representation='vehicles',
+                      islands=1, migration_interval=10, migration_size=2, topology='ring', seed=None, fitness_pool=None,
+                      fitness_cache_size=0, routing='indexed', route_passes=0, on_generation=None, selection_method=None,
+                      tournament_size=5, crossover_method='trucks', local_search_top_k=0, local_search_budget=0.05,
+                      local_search_neighbours=10, local_search_moves=None, stagnation_generations=None, time_budget=None,
+                      target_cost=None, diversity_floor=None, run_info_out=None, adaptive=False, verbose=True,
+                      profile=None):
+    if crossover_method != 'trucks' and crossover_method not in PERMUTATION_CROSSOVERS:
+        raise ValueError(f"Unknown crossover method: {crossover_method}")
+    profiler = Profiler(profile) if profile is not None else None
+    with profiler or nullcontext():
+        # what both forms take, passed by keyword so neither depends on the other's parameter order
+        settings = dict(pop_size=pop_size, generations=generations, crossover_rate=crossover_rate,
+                        mutation_rate=mutation_rate, best_solutions_out=best_solutions_out, seed_genomes=seed_genomes,
+                        fitness_backend=fitness_backend, representation=representation, seed=seed,
+                        fitness_cache_size=fitness_cache_size, routing=routing, route_passes=route_passes,
+                        on_generation=on_generation, selection_method=selection_method,
+                        tournament_size=tournament_size, crossover_method=crossover_method,
+                        local_search_top_k=local_search_top_k, local_search_budget=local_search_budget,
+                        local_search_neighbours=local_search_neighbours, local_search_moves=local_search_moves,
+                        stagnation_generations=stagnation_generations, time_budget=time_budget,
+                        target_cost=target_cost, diversity_floor=diversity_floor, run_info_out=run_info_out,
+                        adaptive=adaptive, verbose=verbose)
+        if islands > 1:
+            from model.islands import island_genetic_algorithm
+            result = island_genetic_algorithm(truck_count, truck_capacity, truck_speed, packages, matrices,
+                                              islands=islands, migration_interval=migration_interval,
+                                              migration_size=migration_size, topology=topology, **settings)
+        else:
+            best_cost = float('inf')
+            for snapshot in genetic_algorithm_generations(truck_count, truck_capacity, truck_speed, packages, matrices,
+                                                          fitness_pool=fitness_pool, **settings):
+                best_cost = snapshot.best_cost
+            result = [], best_cost
+    if profiler is not None and run_info_out is not None:
+        run_info_out['profile'] = profiler.files()
+    return result
+
+
+# Generator form of genetic_algorithm (single population only), same arguments and results.  Yields a
+# GenerationSnapshot (model/streaming.py) after every scored generation and prints nothing unless verbose.
+# The run pauses between snapshots until the next one is asked for.  close() stops it with stop reason 'stopped',
+# so does control.stop() on a RunControl, whose pause() / resume() hold the run between generations.
+# Pass a RunMetrics as metrics to read the phase timings while the run is going.
+def genetic_algorithm_generations(truck_count, truck_capacity, truck_speed, packages, matrices, pop_size=50,
+                                  generations=100, crossover_rate=0.9, mutation_rate=0.2, best_solutions_out=None,
+                                  seed_genomes=None, fitness_backend='python', representation='vehicles', seed=None,
+                                  fitness_pool=None, fitness_cache_size=0, routing='indexed', route_passes=0,
+                                  on_generation=None, selection_method=None, tournament_size=5, crossover_method='trucks',
+                                  local_search_top_k=0, local_search_budget=0.05, local_search_neighbours=10,
+                                  local_search_moves=None, stagnation_generations=None, time_budget=None,
+                                  target_cost=None, diversity_floor=None, run_info_out=None, adaptive=False, verbose=False,
+                                  control=None, metrics=None):
+    if crossover_method != 'trucks' and crossover_method not in PERMUTATION_CROSSOVERS:
+        raise ValueError(f"Unknown crossover method: {crossover_method}")
+    stopping = StoppingCriteria(stagnation_generations, time_budget, target_cost, diversity_floor)
+    if metrics is None:
+        metrics = RunMetrics()
     # Create initial population
     if best_solutions_out is None:
         best_solutions_out = []
     else:
         best_solutions_out.clear()
-    trucks = []
-    for i in range(truck_count):
-         trucks.append(Vehicle(truck_capacity, truck_speed, [], 0, 0))
-    genome = Genome(trucks, packages)
+    if seed is not None:
+        random.seed(seed)
+    rng.reseed()
+
+    with metrics.phase('init'):
+        genome, seed_genomes = create_base_genome(truck_count, truck_capacity, truck_speed, packages, representation, seed_genomes)
+        population = create_initial_population(pop_size, genome,seed_genomes=seed_genomes)
+        buffer = None
+        if representation in ('buffered', 'giant'):
+            buffer = PopulationBuffer(genome, buffer_rows(pop_size))
+            population = buffer.load(population)
+        score_population = create_scorer(genome, packages, matrices, fitness_backend, fitness_pool, routing, route_passes,
+                                         giant_tour=representation == 'giant', metrics=metrics)
+    fitness_cache = None
+    if fitness_cache_size > 0:
+        fitness_cache = FitnessCache(score_population, fitness_cache_size, rescore_stable=representation != 'giant')
+        score_population = fitness_cache
+    local_search = None
+    if local_search_top_k > 0:
+        local_search = create_local_search(genome, packages, matrices, local_search_top_k, local_search_budget,
+                                           local_search_neighbours, local_search_moves)
+
+    controller = None
+    if adaptive:
+        controller = AdaptiveController(pop_size, crossover_rate, mutation_rate, verbose=verbose)
 
-    population = create_initial_population(pop_size, genome,seed_genomes=seed_genomes)
-    
-    best_solutions = []
     best_cost = float('inf')
+    stop_reason = 'generations'
+    generations_run = 0
 
     # Evolution process
-    for generation in range(generations):
-        population_fitness = evaluate_fitness(population, matrices)
-        current_best = population_fitness[0]
-        current_cost = current_best[2]
-
-        # Only save if this is a new best solution
-        if current_cost < best_cost:
-            best_cost = current_cost
-            current_mileage = current_best[0].total_miles
-            print(f"Generation {generation}: New best cost = {best_cost:.1f}. mileage = {current_mileage:.2f}")
-            print(current_best[0])
-
-            best_solutions_out.append({
-                'generation': generation,
-                'genome': current_best[0],
-                'total_cost': current_cost
-            })
-
-        
-        # Select parents based on fitness score for the population, reproductive success rate (which is really it's
-        # inverse here) determines how many parents are selected from the total population.
-        reproductive_success_rate = 2
-        parents = selection(population_fitness, pop_size // reproductive_success_rate)
-        
-        # Crossover
-        offspring = crossover(parents, crossover_rate)
-        
-        # Mutation
-        offspring = mutation(offspring, mutation_rate)
-        
-        # Create new population with elitism (keep the best (pop_size / survival_rate) solution)
-        survival_rate = 10
-        elite_count = max(5,pop_size//survival_rate)
-        elites = [e[0] for e in population_fitness[:elite_count]]
-        population = elites + offspring[:(pop_size-elite_count)]
-
-    return best_solutions, best_cost
\ No newline at end of file
+    try:
+        for generation in range(generations):
+            with metrics.phase('evaluation'):
+                population_fitness = score_population(population)
+            metrics.count('evaluations', len(population))
+            if fitness_cache is not None:
+                metrics.count('cache_hits', fitness_cache.generation_hits)
+                metrics.count('cache_misses', fitness_cache.generation_misses)
+            if local_search is not None:
+                with metrics.phase('local_search'):
+                    population_fitness = local_search.apply(population_fitness)
+            current_best = population_fitness[0]
+            current_cost = current_best[2]
+            if fitness_cache is not None and verbose:
+                print(f"Generation {generation}: fitness cache hits = {fitness_cache.generation_hits}, misses = {fitness_cache.generation_misses}, size = {len(fitness_cache)}")
+
+            # Only save if this is a new best solution
+            if current_cost < best_cost:
+                best_cost = current_cost
+                if representation == 'vehicles' and fitness_backend != 'python':
+                    # The batched backends skip delivery logs, fill them in for the genome that gets displayed
+                    fill_delivery_logs(current_best[0], matrices)
+                if verbose:
+                    current_mileage = current_best[0].total_miles
+                    print(f"Generation {generation}: New best cost = {best_cost:.1f}. mileage = {current_mileage:.2f}")
+                    print(current_best[0])
+
+                best_solutions_out.append({
+                    'generation': generation,
+                    # a copy: buffer rows are reused two generations on, and the best genome carries over as an
+                    # elite that local search may improve in place
+                    'genome': current_best[0].make_copy(),
+                    'total_cost': current_cost
+                })
+
+            if on_generation is not None:
+                on_generation(generation, best_cost)
+            generations_run = generation + 1
+            diversity = population_diversity(population_fitness)
+            mean_cost = sum(entry[2] for entry in population_fitness) / len(population_fitness)
+            metrics.end_generation(generation)
+            yield GenerationSnapshot(generation, best_cost, mean_cost, diversity, stopping.elapsed())
+
+            if control is not None and not control.wait():
+                stop_reason = 'stopped'
+                break
+            reason = stopping.check(generation, best_cost, diversity)
+            if reason is not None and generations_run < generations:
+                stop_reason = reason
+                if verbose:
+                    print(f"Generation {generation}: stopping early ({stop_reason})")
+                break
+            if controller is not None:
+                pop_size, crossover_rate, mutation_rate = controller.update(generation, best_cost, diversity)
+            population = next_generation(population_fitness, pop_size, crossover_rate, mutation_rate, buffer,
+                                         selection_method, tournament_size, crossover_method, metrics)
+    except GeneratorExit:
+        stop_reason = 'stopped'
+        raise
+    finally:
+        if run_info_out is not None:
+            run_info_out.clear()
+            run_info_out.update(stopping.summary(stop_reason, generations_run))
+            run_info_out['metrics'] = metrics.summary()
+            if controller is not None:
+                run_info_out['adaptive'] = controller.log
+
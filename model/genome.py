@@ -1,6 +1,8 @@
 import random
 from model.vehicle import Vehicle
 import datetime
+import hashlib
+import numpy as np
 
 
 class Genome:
@@ -21,20 +23,30 @@ class Genome:
         target_truck = self.trucks[truck_index]
         self.remove_from_trucks(pack_id)
         target_truck.packages.append(pack_id)
+        target_truck.dirty = True
 
     def make_copy(self):
-        trucks = [
-            Vehicle(
+        trucks = []
+        for t in self.trucks:
+            truck = Vehicle(
                 t.capacity,
                 t.speed,
                 list(t.packages),  # shallow copy of package IDs
-                0,  # reset mileage
+                t.mileage,  # cached route results carry over until the route changes
                 0,  # reset address
                 t.depart_time
             )
-            for t in self.trucks
-        ]
-        return Genome(trucks, self.packages.safe_copy())
+            truck.delivery_log = t.delivery_log
+            truck.late_packages = t.late_packages
+            truck.dirty = t.dirty
+            trucks.append(truck)
+        # package specs are immutable, every copy shares the same store
+        return Genome(trucks, self.packages)
+
+    # Forces every truck to be recalculated on the next evaluation
+    def invalidate(self):
+        for truck in self.trucks:
+            truck.dirty = True
 
 
     def swap_packages(self, pid1, pid2):
@@ -42,6 +54,7 @@ class Genome:
         if pid1 == pid2:
             self.remove_from_trucks(pid1)
             self.trucks[-1].packages.append(pid1)
+            self.trucks[-1].dirty = True
             self.sort_genome()
             return
 
@@ -60,6 +73,7 @@ class Genome:
                 if len(truck1.packages) > truck1.capacity or len(truck2.packages) > truck2.capacity:
                     return  # cancel swap if invalid
                 truck1.packages[index1], truck2.packages[index2] = truck2.packages[index2], truck1.packages[index1]
+                truck1.dirty = truck2.dirty = True
         self.sort_genome()
         return
 
@@ -68,6 +82,7 @@ class Genome:
         for truck in self.trucks:
             if pack_id in truck.packages:
                 truck.packages.remove(pack_id)
+                truck.dirty = True
         self.sort_genome()
 
     #This keeps the genome organized and prevents genes from fighting other rearrangements of themselves
@@ -80,9 +95,18 @@ class Genome:
             )
         )
 
-    def sort_truck_routes_by_location(self, d_matrix):
+    # route_builder (model/routing.py) swaps the scan below for a faster or improving route construction engine
+    def sort_truck_routes_by_location(self, d_matrix, route_builder=None):
+        if route_builder is not None:
+            # clean trucks were sorted when their results were cached
+            dirty = [truck for truck in self.trucks if truck.packages and truck.dirty]
+            for truck, route in zip(dirty, route_builder.build_many([truck.packages for truck in dirty])):
+                truck.packages = route
+            return
+
         for truck in self.trucks:
-            if not truck.packages:
+            # clean trucks were sorted when their results were cached
+            if not truck.packages or not truck.dirty:
                 continue
 
             current_address = 0  # start at hub
@@ -104,6 +128,7 @@ class Genome:
     def distribute_packages(self):
         for truck in self.trucks:
             truck.packages = []
+            truck.dirty = True
 
         truck_caps = [truck.capacity for truck in self.trucks]
         truck_loads = [0] * len(self.trucks)
@@ -120,6 +145,7 @@ class Genome:
     def fill_randomly(self):
         for truck in self.trucks:
             truck.packages = []
+            truck.dirty = True
 
         package_ids = list(self.package_list)
         random.shuffle(package_ids)
@@ -140,6 +166,33 @@ class Genome:
 
         self.sort_genome()
 
+    # Digest of the truck routes exactly as evaluate_fitness will read them, equal keys score the same
+    def fitness_key(self):
+        routes = [pkg_id for truck in self.trucks for pkg_id in truck.packages + [-1]]
+        return hashlib.blake2b(np.array(routes, dtype=np.int64).tobytes(), digest_size=16).digest()
+
+    # Everything evaluate_fitness writes onto the genome, so a cached result can be restored onto a clone
+    def result_state(self):
+        return (
+            [list(truck.packages) for truck in self.trucks],
+            [truck.mileage for truck in self.trucks],
+            [list(truck.delivery_log) for truck in self.trucks],
+            [list(truck.late_packages) for truck in self.trucks],
+            list(self.late_packages),
+            self.total_miles
+        )
+
+    def load_result_state(self, state):
+        routes, mileage, delivery_logs, truck_late, late_packages, total_miles = state
+        for truck, route, miles, log, late in zip(self.trucks, routes, mileage, delivery_logs, truck_late):
+            truck.packages = list(route)
+            truck.mileage = miles
+            truck.delivery_log = list(log)
+            truck.late_packages = list(late)
+            truck.dirty = False
+        self.late_packages = list(late_packages)
+        self.total_miles = total_miles
+
     def __str__(self):
         output = "Truck Route Assignments:\n"
         for i, truck in enumerate(self.trucks):
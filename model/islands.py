@@ -0,0 +1,287 @@
+# Island model: several sub-populations evolve in their own worker processes and trade their best
+# genomes every migration_interval generations.
+import multiprocessing
+import pickle
+import random
+import traceback
+import numpy as np
+from model import rng
+from model.compact_genome import CompactGenome
+from model.convergence import StoppingCriteria, population_diversity
+from model.adaptive import AdaptiveController
+from model.fitness_cache import FitnessCache
+from model.metrics import RunMetrics, add_totals, empty_totals
+from model.routing import RouteBuilder
+from model.vectorized_fitness import NumpyFitness
+from model.genetic_algorithm import (buffer_rows, create_base_genome, create_initial_population, create_local_search,
+                                     create_scorer, evaluate_fitness, next_generation)
+from model.population_buffer import PopulationBuffer
+
+TOPOLOGIES = ('ring', 'full')
+
+
+# Genomes cross process boundaries as plain route data so the package table isn't pickled with every migrant
+def export_genome(genome):
+    if isinstance(genome, CompactGenome):
+        return genome.genes.copy()
+    return [list(truck.packages) for truck in genome.trucks]
+
+
+def import_genome(data, base_genome):
+    if isinstance(base_genome, CompactGenome):
+        return CompactGenome(base_genome.table, base_genome.truck_count, base_genome.capacity,
+                             np.array(data, dtype=base_genome.genes.dtype), base_genome.departure_time)
+    genome = base_genome.make_copy()
+    for truck, route in zip(genome.trucks, data):
+        truck.packages = list(route)
+        truck.dirty = True
+    return genome
+
+
+# Which islands each island receives migrants from
+def migration_sources(island, islands, topology):
+    if topology == 'ring':
+        return [(island - 1) % islands]
+    if topology == 'full':
+        return [i for i in range(islands) if i != island]
+    raise ValueError(f"Unknown migration topology: {topology}")
+
+
+class Island:
+    def __init__(self, index, seed, settings, seed_genomes):
+        random.seed(f"{seed}-{index}")
+        rng.reseed()
+        self.metrics = RunMetrics()
+        (truck_count, truck_capacity, truck_speed, packages, matrices, self.pop_size,
+         self.crossover_rate, self.mutation_rate, fitness_backend, representation, fitness_cache_size,
+         routing, route_passes, self.selection_method, self.tournament_size, self.crossover_method,
+         local_search_top_k, local_search_budget, local_search_neighbours, local_search_moves, adaptive,
+         verbose) = settings
+        with self.metrics.phase('init'):
+            self.base_genome, _ = create_base_genome(truck_count, truck_capacity, truck_speed, packages, representation)
+            seeds = [import_genome(data, self.base_genome) for data in seed_genomes]
+            self.population = create_initial_population(self.pop_size, self.base_genome, seed_genomes=seeds)
+            self.buffer = None
+            if representation in ('buffered', 'giant'):
+                self.buffer = PopulationBuffer(self.base_genome, buffer_rows(self.pop_size))
+                self.population = self.buffer.load(self.population)
+            self.score_population = create_scorer(self.base_genome, packages, matrices, fitness_backend,
+                                                  routing=routing, route_passes=route_passes,
+                                                  giant_tour=representation == 'giant', metrics=self.metrics)
+        self.fitness_cache = None
+        if fitness_cache_size > 0:
+            self.score_population = FitnessCache(self.score_population, fitness_cache_size,
+                                                 rescore_stable=representation != 'giant')
+            self.fitness_cache = self.score_population
+        self.local_search = None
+        if local_search_top_k > 0:
+            self.local_search = create_local_search(self.base_genome, packages, matrices, local_search_top_k,
+                                                    local_search_budget, local_search_neighbours, local_search_moves)
+        self.controller = None
+        if adaptive:
+            self.controller = AdaptiveController(self.pop_size, self.crossover_rate, self.mutation_rate, verbose=verbose)
+        self.best_cost = float('inf')
+
+    # Replaces the tail of the population (offspring, never elites) with immigrants and evolves for a while.
+    # Returns the new local bests as (generation, cost, genome data), the top genomes to send out, the
+    # diversity of the last scored generation and the island's metrics totals so far.
+    def run(self, immigrants, generations, first_generation, migration_size):
+        if immigrants:
+            immigrants = [import_genome(data, self.base_genome) for data in immigrants][:self.pop_size]
+            self.population = self.population[:len(self.population) - len(immigrants)] + immigrants
+
+        records = []
+        population_fitness = []
+        for generation in range(first_generation, first_generation + generations):
+            with self.metrics.phase('evaluation'):
+                population_fitness = self.score_population(self.population)
+            self.metrics.count('evaluations', len(self.population))
+            if self.fitness_cache is not None:
+                self.metrics.count('cache_hits', self.fitness_cache.generation_hits)
+                self.metrics.count('cache_misses', self.fitness_cache.generation_misses)
+            if self.local_search is not None:
+                with self.metrics.phase('local_search'):
+                    population_fitness = self.local_search.apply(population_fitness)
+            self.metrics.end_generation(generation)
+            current_best = population_fitness[0]
+            if current_best[2] < self.best_cost:
+                self.best_cost = current_best[2]
+                records.append((generation, current_best[2], export_genome(current_best[0])))
+            if self.controller is not None:
+                self.pop_size, self.crossover_rate, self.mutation_rate = self.controller.update(
+                    generation, self.best_cost, population_diversity(population_fitness))
+            self.population = next_generation(population_fitness, self.pop_size, self.crossover_rate,
+                                              self.mutation_rate, self.buffer, self.selection_method,
+                                              self.tournament_size, self.crossover_method, self.metrics)
+
+        emigrants = [export_genome(entry[0]) for entry in population_fitness[:migration_size]]
+        return records, emigrants, population_diversity(population_fitness), self.metrics.totals
+
+
+# Reply to the parent when an island fails: the exception and its traceback, the exception as text if it can't be pickled
+def error_reply(error):
+    trace = traceback.format_exc()
+    try:
+        pickle.dumps(error)
+    except Exception:
+        error = RuntimeError(repr(error))
+    return 'error', error, trace
+
+
+# Answers every epoch with ('ok', results).  Once the island has failed, building it included, every epoch is
+# answered with its error_reply until the parent sends None.
+def island_worker(conn, index, seed, settings, seed_genomes):
+    failure = None
+    try:
+        island = Island(index, seed, settings, seed_genomes)
+    except Exception as error:
+        failure = error_reply(error)
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        if failure is None:
+            try:
+                reply = 'ok', island.run(*message)
+            except Exception as error:
+                failure = error_reply(error)
+        conn.send(reply if failure is None else failure)
+    conn.close()
+
+
+# Results of an epoch from every island, raising the first island's error.  Every reply is read before raising so
+# no worker is left blocked on a send.
+def receive_results(connections):
+    replies = [conn.recv() for conn in connections]
+    for index, reply in enumerate(replies):
+        if reply[0] == 'error':
+            _, error, trace = reply
+            raise error from RuntimeError(f"island {index} failed:\n{trace}")
+    return [reply[1] for reply in replies]
+
+
+# Runs the islands in lock step epochs.  Every island is seeded from seed and its index and migration happens
+# in the parent between epochs, so a fixed seed gives the same result however the processes are scheduled.
+# That holds unless local search runs on its time budget: where it stops depends on the clock, so runs with
+# local_search_top_k > 0 only repeat with local_search_moves set.
+# Each island evolves pop_size // islands genomes.  Returns (best_solutions, best_cost) like genetic_algorithm and
+# fills best_solutions_out with the global improvements, each tagged with the island it came from.
+# on_generation(generation, best_cost) is called once per epoch with the last generation it covered.
+# The stopping criteria are checked between epochs, against the least diverse island.
+# With adaptive=True every island runs its own AdaptiveController, their decisions are only printed (when verbose).
+# verbose=False leaves out all printing, the islands' included.
+# run_info_out['metrics'] has the phase timings and counters summed over the islands, and each island's in 'islands'.
+def island_genetic_algorithm(truck_count, truck_capacity, truck_speed, packages, matrices, pop_size=50, generations=100,
+                             crossover_rate=0.9, mutation_rate=0.2, best_solutions_out=None, seed_genomes=None,
+                             fitness_backend='python', representation='vehicles', islands=4, migration_interval=10,
+                             migration_size=2, topology='ring', seed=None, fitness_cache_size=0, routing='indexed',
+                             route_passes=0, on_generation=None, selection_method=None, tournament_size=5,
+                             crossover_method='trucks', local_search_top_k=0, local_search_budget=0.05,
+                             local_search_neighbours=10, local_search_moves=None, stagnation_generations=None,
+                             time_budget=None, target_cost=None, diversity_floor=None, run_info_out=None, adaptive=False,
+                             verbose=True):
+    if topology not in TOPOLOGIES:
+        raise ValueError(f"Unknown migration topology: {topology}")
+    if best_solutions_out is None:
+        best_solutions_out = []
+    else:
+        best_solutions_out.clear()
+    if seed is None:
+        seed = random.getrandbits(32)
+    stopping = StoppingCriteria(stagnation_generations, time_budget, target_cost, diversity_floor)
+    stop_reason = 'generations'
+
+    base_genome, seed_genomes = create_base_genome(truck_count, truck_capacity, truck_speed, packages, representation, seed_genomes)
+    island_pop_size = max(10, pop_size // islands)
+    settings = (truck_count, truck_capacity, truck_speed, packages, matrices, island_pop_size,
+                crossover_rate, mutation_rate, fitness_backend, representation, fitness_cache_size, routing, route_passes,
+                selection_method, tournament_size, crossover_method, local_search_top_k, local_search_budget,
+                local_search_neighbours, local_search_moves, adaptive, verbose)
+    exported_seeds = [export_genome(genome) for genome in seed_genomes]
+
+    connections = []
+    workers = []
+    for index in range(islands):
+        parent_conn, child_conn = multiprocessing.Pipe()
+        worker = multiprocessing.Process(target=island_worker, args=(child_conn, index, seed, settings, exported_seeds), daemon=True)
+        worker.start()
+        connections.append(parent_conn)
+        workers.append(worker)
+
+    records = []
+    island_totals = [empty_totals() for _ in range(islands)]
+    inboxes = [[] for _ in range(islands)]
+    try:
+        generation = 0
+        while generation < generations:
+            span = min(migration_interval, generations - generation)
+            for index, conn in enumerate(connections):
+                conn.send((inboxes[index], span, generation, migration_size))
+            results = receive_results(connections)
+
+            emigrants = []
+            diversity = []
+            for index, (island_records, island_emigrants, island_diversity, totals) in enumerate(results):
+                island_totals[index] = totals
+                records.extend((gen, cost, index, data) for gen, cost, data in island_records)
+                emigrants.append(island_emigrants)
+                diversity.append(island_diversity)
+            inboxes = [
+                [data for source in migration_sources(index, islands, topology) for data in emigrants[source]]
+                for index in range(islands)
+            ]
+            generation += span
+            best_so_far = min((record[1] for record in records), default=float('inf'))
+            if on_generation is not None:
+                on_generation(generation - 1, best_so_far)
+            reason = stopping.check(generation - 1, best_so_far, min(diversity))
+            if reason is not None and generation < generations:
+                stop_reason = reason
+                if verbose:
+                    print(f"Generation {generation - 1}: stopping early ({stop_reason})")
+                break
+    finally:
+        for conn in connections:
+            # a worker that died has closed its end, that must not hide the error that got us here
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        for worker in workers:
+            worker.join()
+
+    # Merge: walk every island's improvements in generation order and keep the ones that beat the global best
+    best_cost = float('inf')
+    for gen, cost, index, data in sorted(records, key=lambda r: (r[0], r[1], r[2])):
+        if cost < best_cost:
+            best_cost = cost
+            best_solutions_out.append({
+                'generation': gen,
+                'genome': import_genome(data, base_genome),
+                'total_cost': cost,
+                'island': index
+            })
+
+    # Re-score the kept genomes in this process so their delivery logs are filled in for display.
+    # Their routes were already built on the islands and are scored as they are.
+    if best_solutions_out:
+        if isinstance(base_genome, CompactGenome):
+            engine = NumpyFitness.from_table(base_genome.table, matrices, base_genome.departure_time)
+        else:
+            engine = NumpyFitness.from_packages(packages, matrices, base_genome.departure_time)
+        evaluate_fitness([entry['genome'] for entry in best_solutions_out], matrices,
+                         route_builder=RouteBuilder.from_engine(engine, 'keep'))
+        entry = best_solutions_out[-1]
+        if verbose:
+            print(f"Generation {entry['generation']} (island {entry['island']}): Best cost = {best_cost:.1f}. mileage = {entry['genome'].total_miles:.2f}")
+            print(entry['genome'])
+
+    if run_info_out is not None:
+        run_info_out.clear()
+        run_info_out.update(stopping.summary(stop_reason, generation))
+        metrics = empty_totals()
+        for totals in island_totals:
+            add_totals(metrics, totals)
+        metrics['islands'] = island_totals
+        run_info_out['metrics'] = metrics
+    return [], best_cost
@@ -0,0 +1,234 @@
+# Memetic stage: time or move bounded local search on the best genomes of a generation.
+# Moves are driven by a neighbour list built once from d_matrix: every package only tries moves towards the
+# packages at its nearest addresses.
+#   'relocate' - move a package to just after a neighbour, in its own truck or another one with room
+#   'exchange' - swap a package with a neighbour on another truck
+#   '2-opt'    - reverse the stretch of a route between a package and a neighbour on the same truck
+# Mileage deltas are O(1).  Moves that cut mileage, or touch a late package, are checked against the full cost
+# of the routes they change (mileage + $20 per late package + $20 per active truck) and kept if it drops.
+# Routes are closed at the hub like everywhere else, a route is a list of package keys.
+# A time budget stops the search wherever the clock runs out, so how far it gets depends on the machine and its
+# load and seeded runs don't repeat.  A move budget (moves tried, not kept) stops it at the same point every time.
+import time
+import numpy as np
+from model.compact_genome import CompactGenome
+from model.costs import LATE_COST, TRUCK_COST
+
+
+class LocalSearch:
+    # keys are the package keys of the genomes (table rows or package ids), engine maps them to addresses and
+    # due times.  rescore scores a list of genomes with their routes kept as they are.
+    # time_budget is in seconds per generation, shared by the top_k genomes.  move_budget is the number of moves
+    # tried per generation, shared the same way, and replaces time_budget when given.
+    def __init__(self, engine, keys, capacity, rescore, top_k=5, time_budget=0.05, neighbours=10, move_budget=None):
+        self.capacity = capacity
+        self.rescore = rescore
+        self.top_k = top_k
+        self.time_budget = time_budget
+        self.move_budget = move_budget
+        self.d_rows = engine.d_matrix.tolist()
+        self.t_rows = engine.t_matrix.tolist()
+        self.address_of = engine.pkg_address.tolist()
+        self.due_of = engine.pkg_due.tolist()
+        self.departure_time = int(engine.departure_time)
+        self.neighbours = self.neighbour_list(engine.d_matrix, keys, neighbours)
+
+    # For every key, packages at its neighbours nearest addresses (its own address first), at most two per
+    # address.  Which two rotates with the key, so packages sharing an address don't all pick the same ones.
+    def neighbour_list(self, d_matrix, keys, neighbours):
+        keys = list(keys)
+        at_address = {}
+        for key in keys:
+            at_address.setdefault(self.address_of[key], []).append(key)
+        nearest = np.argsort(d_matrix, axis=1, kind='stable')
+        nearest = [[a for a in row if a in at_address][:neighbours] for row in nearest.tolist()]
+
+        neighbour_list = {}
+        for index, key in enumerate(keys):
+            found = []
+            for address in nearest[self.address_of[key]]:
+                others = at_address[address]
+                for step in range(min(2, len(others))):
+                    other = others[(index + step) % len(others)]
+                    if other != key:
+                        found.append(other)
+            neighbour_list[key] = found
+        return neighbour_list
+
+    # (cost, late keys) of a single route
+    def route_cost(self, route):
+        if not route:
+            return 0.0, ()
+        d, t, a = self.d_rows, self.t_rows, self.address_of
+        miles = 0.0
+        clock = self.departure_time
+        current = 0
+        late = []
+        for key in route:
+            nxt = a[key]
+            miles += d[current][nxt]
+            clock += t[current][nxt]
+            if clock > self.due_of[key]:
+                late.append(key)
+            current = nxt
+        miles += d[current][0]
+        return miles + LATE_COST * len(late) + TRUCK_COST, late
+
+    # Improves routes in place until no move helps, the deadline passes or moves moves have been tried
+    # (moves=None doesn't limit them).  Returns the indices of changed routes and the number of moves tried.
+    def improve_routes(self, routes, deadline, moves=None):
+        d, a = self.d_rows, self.address_of
+        costs = []
+        late = set()
+        route_of = {}
+        for r, route in enumerate(routes):
+            cost, route_late = self.route_cost(route)
+            costs.append(cost)
+            late.update(route_late)
+            for key in route:
+                route_of[key] = r
+        changed = set()
+
+        # address of the stop before / after index i of a route, the hub at both ends
+        def before(route, i):
+            return a[route[i - 1]] if i > 0 else 0
+
+        def after(route, i):
+            return a[route[i + 1]] if i + 1 < len(route) else 0
+
+        def commit(r, s, new_r, new_s, cost_r, cost_s):
+            for key in routes[r] + (routes[s] if s != r else []):
+                late.discard(key)
+            routes[r][:] = new_r
+            costs[r] = cost_r[0]
+            late.update(cost_r[1])
+            changed.add(r)
+            if s != r:
+                routes[s][:] = new_s
+                costs[s] = cost_s[0]
+                late.update(cost_s[1])
+                changed.add(s)
+                for key in new_s:
+                    route_of[key] = s
+            for key in new_r:
+                route_of[key] = r
+
+        tried = 0
+        limit = moves if moves is not None else float('inf')
+        improved = True
+        while improved and tried < limit and time.perf_counter() < deadline:
+            improved = False
+            for key in list(route_of):
+                if tried >= limit or time.perf_counter() >= deadline:
+                    break
+                for other in self.neighbours[key]:
+                    if tried >= limit:
+                        break
+                    tried += 1
+                    r, s = route_of[key], route_of[other]
+                    route, other_route = routes[r], routes[s]
+                    i, j = route.index(key), other_route.index(other)
+                    p, q = a[key], a[other]
+                    is_late = key in late
+
+                    # relocate key to just after other
+                    if s != r and len(other_route) < self.capacity or s == r and j != i - 1:
+                        removed = d[before(route, i)][p] + d[p][after(route, i)] - d[before(route, i)][after(route, i)]
+                        if s == r:
+                            new_r = route[:i] + route[i + 1:]
+                            k = new_r.index(other)
+                            new_r.insert(k + 1, key)
+                            delta = -removed + d[q][p] + d[p][after(new_r, k + 1)] - d[q][after(new_r, k + 1)]
+                            if delta < -1e-9 or is_late:
+                                cost_r = self.route_cost(new_r)
+                                if cost_r[0] < costs[r] - 1e-9:
+                                    commit(r, r, new_r, None, cost_r, None)
+                                    improved = True
+                                    break
+                        else:
+                            added = d[q][p] + d[p][after(other_route, j)] - d[q][after(other_route, j)]
+                            emptied = TRUCK_COST if len(route) == 1 else 0.0
+                            if added - removed - emptied < -1e-9 or is_late:
+                                new_r = route[:i] + route[i + 1:]
+                                new_s = other_route[:j + 1] + [key] + other_route[j + 1:]
+                                cost_r, cost_s = self.route_cost(new_r), self.route_cost(new_s)
+                                if cost_r[0] + cost_s[0] < costs[r] + costs[s] - 1e-9:
+                                    commit(r, s, new_r, new_s, cost_r, cost_s)
+                                    improved = True
+                                    break
+
+                    # exchange key and other between their trucks
+                    if s != r:
+                        pb, pa = before(route, i), after(route, i)
+                        qb, qa = before(other_route, j), after(other_route, j)
+                        delta = (d[pb][q] + d[q][pa] - d[pb][p] - d[p][pa]
+                                 + d[qb][p] + d[p][qa] - d[qb][q] - d[q][qa])
+                        if delta < -1e-9 or is_late:
+                            new_r = route[:i] + [other] + route[i + 1:]
+                            new_s = other_route[:j] + [key] + other_route[j + 1:]
+                            cost_r, cost_s = self.route_cost(new_r), self.route_cost(new_s)
+                            if cost_r[0] + cost_s[0] < costs[r] + costs[s] - 1e-9:
+                                commit(r, s, new_r, new_s, cost_r, cost_s)
+                                improved = True
+                                break
+
+                    # 2-opt: reverse the stretch between them so other follows key (or key follows other)
+                    elif abs(i - j) > 1:
+                        lo, hi = (i, j) if i < j else (j, i)
+                        first, last = a[route[lo + 1]], a[route[hi]]
+                        delta = (d[a[route[lo]]][last] + d[first][after(route, hi)]
+                                 - d[a[route[lo]]][first] - d[last][after(route, hi)])
+                        if delta < -1e-9 or is_late:
+                            new_r = route[:lo + 1] + route[lo + 1:hi + 1][::-1] + route[hi + 1:]
+                            cost_r = self.route_cost(new_r)
+                            if cost_r[0] < costs[r] - 1e-9:
+                                commit(r, r, new_r, None, cost_r, None)
+                                improved = True
+                                break
+        return changed, tried
+
+    # Routes of a genome as lists of package keys
+    def genome_routes(self, genome):
+        if isinstance(genome, CompactGenome):
+            starts, ends = genome.truck_bounds()
+            order = genome.order.tolist()
+            return [order[start:end] for start, end in zip(starts.tolist(), ends.tolist())]
+        return [list(truck.packages) for truck in genome.trucks]
+
+    def set_genome_routes(self, genome, routes, changed):
+        if isinstance(genome, CompactGenome):
+            genome.order[:] = [key for route in routes for key in route]
+            genome.loads[:] = [len(route) for route in routes]
+            # truck spans may have moved, cached per position results no longer line up
+            genome.truck_dirty[:] = True
+            return
+        for r in changed:
+            genome.trucks[r].packages = routes[r]
+            genome.trucks[r].dirty = True
+
+    # Improves the top_k genomes of a scored population (best first) in place and re-scores them.
+    # Returns the population fitness re-sorted best first.
+    def apply(self, population_fitness):
+        top = population_fitness[:self.top_k]
+        start = time.perf_counter()
+        tried = 0
+        improved = []
+        for rank, (genome, _, _) in enumerate(top):
+            # each genome gets an equal share of what is left of the budget
+            if self.move_budget is None:
+                deadline, moves = start + self.time_budget * (rank + 1) / len(top), None
+            else:
+                deadline, moves = float('inf'), self.move_budget * (rank + 1) // len(top) - tried
+            routes = self.genome_routes(genome)
+            changed, genome_tried = self.improve_routes(routes, deadline, moves)
+            tried += genome_tried
+            if changed:
+                self.set_genome_routes(genome, routes, changed)
+                improved.append(genome)
+        if not improved:
+            return population_fitness
+
+        rescored = {id(entry[0]): entry for entry in self.rescore(improved)}
+        population_fitness = [rescored.get(id(entry[0]), entry) for entry in population_fitness]
+        population_fitness.sort(key=lambda x: x[1], reverse=True)
+        return population_fitness
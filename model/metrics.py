@@ -0,0 +1,109 @@
+# Per phase timing and counters for a GA run.
+# Phases (wall time and number of calls):
+#   'init'          - building the first population and its scorer
+#   'evaluation'    - scoring a population, route sorting and splitting included
+#   'route_sorting' - ordering the packages of changed trucks, in process only (pool workers aren't timed)
+#   'local_search'  - the memetic stage, its re-scoring included
+#   'selection', 'crossover', 'mutation', 'elitism' - breeding the next population
+# Counters: 'generations', 'evaluations' (genomes scored, cached or not), 'cache_hits' and 'cache_misses'.
+# What every generation took is kept in generations, one record per scored generation covering the breeding of
+# its population and the scoring of it.  prometheus_text renders totals for the dash /metrics route.
+import time
+from contextlib import contextmanager, nullcontext
+
+PHASES = ('init', 'evaluation', 'route_sorting', 'local_search', 'selection', 'crossover', 'mutation', 'elitism')
+COUNTERS = ('generations', 'evaluations', 'cache_hits', 'cache_misses')
+
+
+def empty_totals():
+    return {
+        'seconds': dict.fromkeys(PHASES, 0.0),
+        'calls': dict.fromkeys(PHASES, 0),
+        'counters': dict.fromkeys(COUNTERS, 0),
+    }
+
+
+# Adds other into totals (subtracts with sign=-1) and returns totals
+def add_totals(totals, other, sign=1):
+    for group in ('seconds', 'calls', 'counters'):
+        for name, value in other[group].items():
+            totals[group][name] = totals[group].get(name, 0) + sign * value
+    return totals
+
+
+def copy_totals(totals):
+    return add_totals(empty_totals(), totals)
+
+
+# Timer for an optional RunMetrics, does nothing without one
+def timed(metrics, name):
+    return metrics.phase(name) if metrics is not None else nullcontext()
+
+
+class RunMetrics:
+    def __init__(self):
+        self.totals = empty_totals()
+        self.generations = []
+        self.generation_start = empty_totals()
+        self.drained = empty_totals()
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.totals['seconds'][name] += time.perf_counter() - start
+            self.totals['calls'][name] += 1
+
+    def count(self, name, amount=1):
+        self.totals['counters'][name] += amount
+
+    # Closes the record of a scored generation
+    def end_generation(self, generation):
+        self.count('generations')
+        record = add_totals(copy_totals(self.totals), self.generation_start, -1)
+        record['generation'] = generation
+        self.generations.append(record)
+        self.generation_start = copy_totals(self.totals)
+
+    # Totals since the last drain, for reporting a run that is still going
+    def drain(self):
+        delta = add_totals(copy_totals(self.totals), self.drained, -1)
+        self.drained = copy_totals(self.totals)
+        return delta
+
+    # What run_info_out['metrics'] gets filled with
+    def summary(self):
+        summary = copy_totals(self.totals)
+        summary['generations'] = self.generations
+        return summary
+
+
+def prometheus_lines(lines, name, kind, help_text, samples):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} {kind}')
+    for labels, value in samples:
+        label_text = ','.join(f'{key}="{label}"' for key, label in labels.items())
+        lines.append(f'{name}{{{label_text}}} {value}' if label_text else f'{name} {value}')
+
+
+# Prometheus text exposition of accumulated totals.  gauges maps extra metric names to (help, value).
+def prometheus_text(totals, gauges=None, prefix='genetic_dash'):
+    lines = []
+    prometheus_lines(lines, f'{prefix}_phase_seconds_total', 'counter', 'Wall time spent in each GA phase.',
+                     [({'phase': phase}, seconds) for phase, seconds in totals['seconds'].items()])
+    prometheus_lines(lines, f'{prefix}_phase_calls_total', 'counter', 'Times each GA phase ran.',
+                     [({'phase': phase}, calls) for phase, calls in totals['calls'].items()])
+    help_texts = {
+        'generations': 'Generations scored.',
+        'evaluations': 'Genomes scored, cached or not.',
+        'cache_hits': 'Genomes whose result came from the fitness cache.',
+        'cache_misses': 'Genomes the fitness cache had to score.',
+        'runs': 'Runs finished.',
+    }
+    for name, value in totals['counters'].items():
+        prometheus_lines(lines, f'{prefix}_{name}_total', 'counter', help_texts.get(name, name), [({}, value)])
+    for name, (help_text, value) in (gauges or {}).items():
+        prometheus_lines(lines, f'{prefix}_{name}', 'gauge', help_text, [({}, value)])
+    return '\n'.join(lines) + '\n'
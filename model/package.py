@@ -1,5 +1,8 @@
 import datetime
 import csv
+from collections import namedtuple
+
+END_OF_DAY = datetime.timedelta(hours=23, minutes=59, seconds=59)
 
 
 #UI Methods I wrote.  They look ugly in here but nice on screen.
@@ -21,17 +24,34 @@ def format_package_text(id_text, address_text, status_text, time_departed_text,
 def get_header():
     return format_package_text("Id","Address", "Status", "Departure", "Due", "Delivered",)
 
+#Due time from the csv format, 'EOD' or 'HH:MM'
+def parse_due(time_due):
+    if time_due == 'EOD':
+        return END_OF_DAY
+    #using python stripping here for easy inputs from the csv
+    return datetime.timedelta(hours = int (time_due[0:2]), minutes = int(time_due[3:5]), seconds = int(0))
+
+
+#Immutable package definition shared by every genome of a run.
+#Delivery results belong to the genome that produced them (truck delivery logs, CompactGenome.delivery_times),
+#so genomes can share one package store and be copied or scored in parallel.
+class PackageSpec(namedtuple('PackageSpec', ['id', 'address', 'time_due'])):
+    __slots__ = ()
+
+    @staticmethod
+    def from_csv(package_id, address, time_due):
+        return PackageSpec(int(package_id), int(address), parse_due(time_due))
+
+    def ontime(self, time_delivered):
+        return time_delivered <= self.time_due
+
+
 #(Task A and Task B)  This class allows for the easy implementation of packages inside the hashchain class
 class Package:
     def __init__(self, package_id, address, time_due):
         self.id = package_id
         self.address = int(address)
-
-        if time_due == 'EOD':
-            self.time_due = datetime.timedelta(hours=23, minutes=59, seconds=59)
-        else:
-            #using python stripping here for easy inputs from the csv
-            self.time_due = datetime.timedelta(hours = int (time_due[0:2]), minutes = int(time_due[3:5]), seconds = int(0))
+        self.time_due = parse_due(time_due)
 
         self.status = "Unavailable"
         self.time_departed = None
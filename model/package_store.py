@@ -0,0 +1,55 @@
+# Dense package store indexed directly by package id.
+# Same insert/get/remove/keys API as HashChain, but get is a single list index and keys() is built once and
+# reused until the store changes.  Package ids are small non-negative integers, so the slot list stays dense.
+class PackageStore:
+    def __init__(self, capacity=8):
+        self.slots = [None] * capacity
+        self.size = 0
+        self.key_list = None
+
+    def __len__(self):
+        return self.size
+
+    # Copies the slots, packages are shared the same way HashChain.safe_copy shares them
+    def safe_copy(self):
+        copy = PackageStore(0)
+        copy.slots = list(self.slots)
+        copy.size = self.size
+        copy.key_list = self.key_list
+        return copy
+
+    #Insert add or update a key
+    def insert(self, key, value):
+        if key < 0:
+            raise ValueError(f"Package ids must be non-negative, got {key}")
+        if key >= len(self.slots):
+            self.slots.extend([None] * (max(key + 1, 2 * len(self.slots)) - len(self.slots)))
+        if self.slots[key] is None:
+            self.size += 1
+            self.key_list = None
+        self.slots[key] = value
+
+    def remove(self, key):
+        if 0 <= key < len(self.slots) and self.slots[key] is not None:
+            self.slots[key] = None
+            self.size -= 1
+            self.key_list = None
+            return 0
+
+        #if the program gets this far, the requested key was not found and a console message is displayed
+        print(f'Key: {key} not found, removal has failed')
+        return -1
+
+    def get(self, key):
+        if 0 <= key < len(self.slots):
+            return self.slots[key]
+        return None
+
+    # Keys in ascending order.  The list is shared between calls, copy it before changing it.
+    def keys(self):
+        if self.key_list is None:
+            self.key_list = [key for key, value in enumerate(self.slots) if value is not None]
+        return self.key_list
+
+    def __str__(self):
+        return str({key: self.slots[key] for key in self.keys()})
@@ -0,0 +1,26 @@
+import numpy as np
+from model.vectorized_fitness import to_microseconds
+
+
+# Read-only package metadata shared by every compact genome of a run.
+# Packages are stored by row (sorted by package id), so row order and id order agree.
+class PackageTable:
+    def __init__(self, packages):
+        self.ids = np.array(sorted(packages.keys()), dtype=np.int64)
+        self.objects = [packages.get(pkg_id) for pkg_id in self.ids.tolist()]
+        self.address = np.array([pkg.address for pkg in self.objects], dtype=np.int64)
+        self.due = np.array([to_microseconds(pkg.time_due) for pkg in self.objects], dtype=np.int64)
+        self.row_of = {pkg_id: row for row, pkg_id in enumerate(self.ids.tolist())}
+        for array in (self.ids, self.address, self.due):
+            array.setflags(write=False)
+
+    def __len__(self):
+        return len(self.objects)
+
+    # HashChain style lookups so views can treat the table like genome.packages
+    def get(self, key):
+        row = self.row_of.get(key)
+        return None if row is None else self.objects[row]
+
+    def keys(self):
+        return self.ids.tolist()
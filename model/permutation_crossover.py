@@ -0,0 +1,100 @@
+# Crossover operators on the giant tour of a CompactGenome (its package order read truck after truck).
+# Each operator builds a child permutation in linear time, the child is then split into trucks with the loads
+# of its first parent, so capacities are respected without any repair step.
+#   'ox'  - order crossover: keeps a slice of parent 1, the rest follows parent 2's order
+#   'pmx' - partially mapped crossover: keeps a slice of parent 1, the rest sits where parent 2 had it
+#   'erx' - edge recombination: walks the union of both parents' neighbour edges, keeping adjacencies
+import numpy as np
+
+PERMUTATION_CROSSOVERS = ('ox', 'pmx', 'erx')
+
+
+def order_crossover(parent1, parent2, start, end):
+    n = len(parent1)
+    child = np.empty(n, dtype=parent1.dtype)
+    child[start:end] = parent1[start:end]
+    taken = np.zeros(n, dtype=bool)
+    taken[parent1[start:end]] = True
+    # fill from the end of the slice around to its start, in parent 2's order from the same point
+    rotated = np.roll(parent2, -end)
+    positions = np.roll(np.arange(n), -end)[:n - (end - start)]
+    child[positions] = rotated[~taken[rotated]]
+    return child
+
+
+def partially_mapped_crossover(parent1, parent2, start, end):
+    n = len(parent1)
+    child = parent2.copy()
+    child[start:end] = parent1[start:end]
+    in_slice = np.zeros(n, dtype=bool)
+    in_slice[parent1[start:end]] = True
+    position_in_parent1 = np.empty(n, dtype=np.int64)
+    position_in_parent1[parent1] = np.arange(n)
+
+    outside = np.concatenate([np.arange(start), np.arange(end, n)])
+    values = parent2[outside]
+    # values already placed by the slice follow the slice's mapping until they land on a free one
+    conflict = in_slice[values]
+    while conflict.any():
+        values[conflict] = parent2[position_in_parent1[values[conflict]]]
+        conflict = in_slice[values]
+    child[outside] = values
+    return child
+
+
+def edge_recombination(parent1, parent2, generator):
+    n = len(parent1)
+    # up to four neighbours per package: both sides in both (cyclic) parent tours
+    edges = np.empty((n, 4), dtype=np.int64)
+    for column, parent in enumerate((parent1, parent2)):
+        edges[parent, 2 * column] = np.roll(parent, 1)
+        edges[parent, 2 * column + 1] = np.roll(parent, -1)
+    neighbours = [set(row) for row in edges.tolist()]
+    for package, row in enumerate(neighbours):
+        row.discard(package)
+
+    unvisited = np.ones(n, dtype=bool)
+    # remaining packages in a random order, the fallback when a walk runs into a dead end
+    fallback = generator.permutation(n).tolist()
+    fallback_index = 0
+    child = np.empty(n, dtype=parent1.dtype)
+    current = int(parent1[0])
+    for position in range(n):
+        child[position] = current
+        unvisited[current] = False
+        for neighbour in neighbours[current]:
+            neighbours[neighbour].discard(current)
+        if position == n - 1:
+            break
+        if neighbours[current]:
+            # the neighbour with the fewest onward edges, ties go to the smallest package
+            current = min(neighbours[current], key=lambda package: (len(neighbours[package]), package))
+        else:
+            while not unvisited[fallback[fallback_index]]:
+                fallback_index += 1
+            current = fallback[fallback_index]
+    return child
+
+
+# Gives child (a copy of parent1) a new giant tour from the named operator, keeping parent1's truck loads.
+# Trucks whose packages come out exactly as in parent1 keep their cached results.
+def permutation_child(child, parent1, parent2, method, generator):
+    n = parent1.package_count
+    first = parent1.order.astype(np.int64)
+    second = parent2.order.astype(np.int64)
+    if method == 'erx':
+        tour = edge_recombination(first, second, generator)
+    else:
+        start, end = np.sort(generator.choice(n + 1, 2, replace=False))
+        if method == 'ox':
+            tour = order_crossover(first, second, start, end)
+        elif method == 'pmx':
+            tour = partially_mapped_crossover(first, second, start, end)
+        else:
+            raise ValueError(f"Unknown crossover method: {method}")
+
+    changed = np.nonzero(tour != first)[0]
+    if len(changed):
+        child.order[:] = tour
+        child.truck_dirty[np.unique(child.trucks_at(changed))] = True
+    return child
@@ -0,0 +1,46 @@
+import numpy as np
+from model.compact_genome import CompactGenome
+
+
+# Double-buffered struct-of-arrays population of CompactGenomes.
+# Genes and cached results of every genome are rows of preallocated (2, rows, ...) arrays, one half holding the
+# parent generation and the other the children being bred.  The genomes handed out are views over those rows,
+# created once, so breeding a generation writes into the child half in place instead of allocating genomes.
+# Views are overwritten two generations later, keep a make_copy() of anything that has to outlive that.
+class PopulationBuffer:
+    def __init__(self, base_genome, rows):
+        n = base_genome.package_count
+        truck_count = base_genome.truck_count
+        self.rows = rows
+        self.genes = np.zeros((2, rows, n + truck_count), dtype=base_genome.genes.dtype)
+        self.mileage = np.zeros((2, rows, truck_count))
+        self.truck_dirty = np.ones((2, rows, truck_count), dtype=bool)
+        self.delivery_times = np.zeros((2, rows, n), dtype=np.int64)
+        self.late_mask = np.zeros((2, rows, n), dtype=bool)
+        self.views = [
+            [
+                CompactGenome.view(base_genome, self.genes[half, row], self.mileage[half, row],
+                                   self.truck_dirty[half, row], self.delivery_times[half, row],
+                                   self.late_mask[half, row])
+                for row in range(rows)
+            ]
+            for half in (0, 1)
+        ]
+        self.current = 0
+
+    # Copies population into the current half and returns the views over it
+    def load(self, population):
+        if len(population) > self.rows:
+            raise ValueError(f"Population of {len(population)} does not fit a buffer of {self.rows} rows")
+        views = self.views[self.current]
+        for view, genome in zip(views, population):
+            view.assign(genome)
+        return views[:len(population)]
+
+    # Views over the half the next generation is written into
+    def children(self):
+        return self.views[1 - self.current]
+
+    # The children become the parents of the next generation
+    def swap(self):
+        self.current = 1 - self.current
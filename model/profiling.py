@@ -0,0 +1,81 @@
+# On demand profiling of a single run.
+# A Profiler captures the thread that enters it two ways at once and writes both next to each other:
+#   <path>.pstats    - cProfile statistics, open with python -m pstats or snakeviz
+#   <path>.collapsed - stacks sampled every interval seconds, one "outer;...;inner count" line per distinct
+#                      stack, the input flamegraph.pl / speedscope / inferno expect
+# Sampling runs in its own thread and only looks at the profiled one, so worker processes (fitness pool,
+# islands) don't show up in either file.
+import cProfile
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+
+def frame_name(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+# Stack of a frame as outermost;...;innermost
+def collapse(frame):
+    names = []
+    while frame is not None:
+        names.append(frame_name(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+# Where a profile of name goes: directory/name-<timestamp>, without the extensions.
+# name is a file name, anything that could leave directory is refused.
+def profile_path(directory, name):
+    if not name or name in ('.', '..') or any(sep in name for sep in (os.sep, os.altsep, '/') if sep):
+        raise ValueError(f"Invalid profile name: {name!r}")
+    return os.path.join(directory, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}")
+
+
+class Profiler:
+    def __init__(self, path, interval=0.005):
+        self.path = path
+        self.interval = interval
+        self.stacks = Counter()
+        self.profile = None
+        self.thread_id = None
+        self.sampler = None
+        self.stopping = threading.Event()
+
+    def sample(self):
+        while not self.stopping.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[collapse(frame)] += 1
+
+    def __enter__(self):
+        self.thread_id = threading.get_ident()
+        self.sampler = threading.Thread(target=self.sample, daemon=True)
+        self.sampler.start()
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profile.disable()
+        self.stopping.set()
+        self.sampler.join()
+        self.write()
+        return False
+
+    # Paths of the files written, as {'pstats': ..., 'collapsed': ...}
+    def files(self):
+        return {'pstats': self.path + '.pstats', 'collapsed': self.path + '.collapsed'}
+
+    def write(self):
+        files = self.files()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.profile.dump_stats(files['pstats'])
+        with open(files['collapsed'], 'w') as collapsed:
+            for stack, count in self.stacks.most_common():
+                collapsed.write(f"{stack} {count}\n")
@@ -0,0 +1,22 @@
+import hashlib
+import random
+import numpy as np
+
+# Shared numpy generator for the array based operators.  It is reseeded from the random module at the
+# start of every run, so seeding random (as genetic_algorithm.py does) also reproduces the array operators.
+# The seed is a digest of random's state rather than a draw from it, so runs that never use this generator
+# (Genome populations with the python operators) see the same random stream as if it didn't exist.
+
+
+def seed_from_random():
+    digest = hashlib.sha256(repr(random.getstate()).encode()).digest()
+    return int.from_bytes(digest[:8], 'little')
+
+
+generator = np.random.default_rng(seed_from_random())
+
+
+def reseed():
+    global generator
+    generator = np.random.default_rng(seed_from_random())
+    return generator
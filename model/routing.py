@@ -0,0 +1,194 @@
+# Route construction engines used to order the packages on each truck.
+#   'scan'       - the original nearest neighbour, a min() over every remaining package per stop, O(n^2)
+#   'indexed'    - nearest neighbour over a precomputed per-address list of neighbours sorted by distance.
+#                  Packages are queued by address, so a stop costs at most one walk down the neighbour list.
+#   'vectorized' - nearest neighbour over a batch of routes at once in NumPy
+#   'keep'       - leaves routes as they are, for re-scoring routes that were already built and for giant tours
+# All three build the same routes, ties included.  An optional bounded 2-opt / Or-opt pass then shortens them,
+# only accepting moves that cut mileage without making any more packages late.
+from collections import deque
+import numpy as np
+
+ROUTE_METHODS = ('scan', 'indexed', 'vectorized', 'keep')
+
+
+# Nearest neighbour over many routes in lock step.  routes holds package keys, addresses maps them to addresses.
+# argmin returns the first minimum in the original route order, which is the tie break the scan uses.
+def batched_nearest_neighbour(d_matrix, routes, addresses, lengths):
+    rows, width = routes.shape
+    remaining = np.arange(width)[None, :] < lengths[:, None]
+    current = np.zeros(rows, dtype=np.int64)
+    sorted_routes = routes.copy()
+    row_index = np.arange(rows)
+
+    for step in range(width):
+        active = step < lengths
+        if not active.any():
+            break
+        dist = d_matrix[current[:, None], addresses]
+        dist[~remaining] = np.inf
+        choice = dist.argmin(axis=1)
+        choice_rows = row_index[active]
+        choice_cols = choice[active]
+        sorted_routes[choice_rows, step] = routes[choice_rows, choice_cols]
+        remaining[choice_rows, choice_cols] = False
+        current[choice_rows] = addresses[choice_rows, choice_cols]
+    return sorted_routes
+
+
+class RouteBuilder:
+    # pkg_address / pkg_due are indexed by package key (id or table row), due and t_matrix are in microseconds.
+    # max_passes bounds the improvement pass, 0 turns it off.  Moves only reach window stops along the route,
+    # which keeps a pass at O(route length * window).
+    def __init__(self, d_matrix, t_matrix, pkg_address, pkg_due, departure_time, method='indexed', max_passes=0, window=10):
+        if method not in ROUTE_METHODS:
+            raise ValueError(f"Unknown route construction method: {method}")
+        self.method = method
+        self.max_passes = max_passes
+        self.window = window
+        self.d_array = np.asarray(d_matrix, dtype=np.float64)
+        self.d_rows = self.d_array.tolist()
+        self.t_rows = np.asarray(t_matrix, dtype=np.int64).tolist()
+        self.pkg_address = np.asarray(pkg_address, dtype=np.int64)
+        self.address_of = self.pkg_address.tolist()
+        self.due_of = np.asarray(pkg_due, dtype=np.int64).tolist()
+        self.departure_time = int(departure_time)
+        # stable sort keeps equal distances in address order
+        self.neighbours = np.argsort(self.d_array, axis=1, kind='stable').tolist()
+
+    # Builder sharing the array engine's package and matrix data
+    @staticmethod
+    def from_engine(engine, method='indexed', max_passes=0, window=10):
+        return RouteBuilder(engine.d_matrix, engine.t_matrix, engine.pkg_address, engine.pkg_due,
+                            engine.departure_time, method, max_passes, window)
+
+    def build(self, route):
+        return self.build_many([route])[0]
+
+    def build_many(self, routes):
+        if self.method == 'vectorized':
+            built = self.vectorized(routes)
+        elif self.method == 'keep':
+            built = [list(route) for route in routes]
+        elif self.method == 'indexed':
+            built = [self.indexed(route) for route in routes]
+        else:
+            built = [self.scan(route) for route in routes]
+        if self.max_passes:
+            built = [self.improve(route) for route in built]
+        return built
+
+    def scan(self, route):
+        current_address = 0
+        sorted_route = []
+        remaining = list(route)
+        while remaining:
+            closest_pkg = min(remaining, key=lambda key: self.d_rows[current_address][self.address_of[key]])
+            sorted_route.append(closest_pkg)
+            current_address = self.address_of[closest_pkg]
+            remaining.remove(closest_pkg)
+        return sorted_route
+
+    def indexed(self, route):
+        # queue packages by address, keeping their position in the route for tie breaks
+        queues = {}
+        for position, key in enumerate(route):
+            queues.setdefault(self.address_of[key], deque()).append((position, key))
+
+        sorted_route = []
+        current = 0
+        while queues:
+            row = self.d_rows[current]
+            best = None
+            for address in self.neighbours[current]:
+                if address not in queues:
+                    continue
+                if best is None:
+                    best = address
+                elif row[address] == row[best]:
+                    if queues[address][0][0] < queues[best][0][0]:
+                        best = address
+                else:
+                    break
+            queue = queues[best]
+            sorted_route.append(queue.popleft()[1])
+            if not queue:
+                del queues[best]
+            current = best
+        return sorted_route
+
+    def vectorized(self, routes):
+        lengths = np.array([len(route) for route in routes], dtype=np.int64)
+        width = max(1, int(lengths.max()) if len(lengths) else 1)
+        padded = np.zeros((len(routes), width), dtype=np.int64)
+        for r, route in enumerate(routes):
+            padded[r, :len(route)] = route
+        sorted_routes = batched_nearest_neighbour(self.d_array, padded, self.pkg_address[padded], lengths)
+        return [sorted_routes[r, :lengths[r]].tolist() for r in range(len(routes))]
+
+    def late_count(self, route):
+        late = 0
+        clock = self.departure_time
+        current = 0
+        for key in route:
+            address = self.address_of[key]
+            clock += self.t_rows[current][address]
+            if clock > self.due_of[key]:
+                late += 1
+            current = address
+        return late
+
+    # Bounded first-improvement 2-opt and Or-opt (moving runs of 1-3 stops) on a single route.
+    # Mileage deltas are O(1), lateness is only re-checked for moves that would shorten the route.
+    def improve(self, route):
+        route = list(route)
+        if len(route) < 3:
+            return route
+        d = self.d_rows
+        a = self.address_of
+        # every truck drives back to the hub after its last stop
+        end = 0
+        window = self.window
+        late = self.late_count(route)
+
+        for _ in range(self.max_passes):
+            improved = False
+            n = len(route)
+
+            # 2-opt: reverse route[i..j]
+            for i in range(n - 1):
+                for j in range(i + 1, min(n, i + 1 + window)):
+                    prev = a[route[i - 1]] if i > 0 else 0
+                    nxt = a[route[j + 1]] if j + 1 < n else end
+                    first, last = a[route[i]], a[route[j]]
+                    delta = d[prev][last] + d[first][nxt] - d[prev][first] - d[last][nxt]
+                    if delta < -1e-9:
+                        candidate = route[:i] + route[i:j + 1][::-1] + route[j + 1:]
+                        candidate_late = self.late_count(candidate)
+                        if candidate_late <= late:
+                            route, late, improved = candidate, candidate_late, True
+
+            # Or-opt: move route[i:i+k] between two other stops
+            for k in (1, 2, 3):
+                for i in range(n - k + 1):
+                    prev = a[route[i - 1]] if i > 0 else 0
+                    nxt = a[route[i + k]] if i + k < n else end
+                    first, last = a[route[i]], a[route[i + k - 1]]
+                    removed = d[prev][first] + d[last][nxt] - d[prev][nxt]
+                    rest = route[:i] + route[i + k:]
+                    for j in range(max(0, i - window), min(len(rest), i + window) + 1):
+                        if j == i:
+                            continue
+                        u = a[rest[j - 1]] if j > 0 else 0
+                        v = a[rest[j]] if j < len(rest) else end
+                        delta = d[u][first] + d[last][v] - d[u][v] - removed
+                        if delta < -1e-9:
+                            candidate = rest[:j] + route[i:i + k] + rest[j:]
+                            candidate_late = self.late_count(candidate)
+                            if candidate_late <= late:
+                                route, late, improved = candidate, candidate_late, True
+                                break
+
+            if not improved:
+                break
+        return route
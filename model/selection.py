@@ -0,0 +1,49 @@
+# Batched parent selection over a fitness vector.  Every parent of a generation is drawn in one go from the
+# shared numpy generator (model/rng.py), so a seeded run selects the same parents every time.
+#   'tournament' - num_parents x tournament_size competitor indices (drawn with replacement), best of each row wins
+#   'rank'       - linear ranking: chance grows with rank instead of raw fitness, selection_pressure in [1, 2]
+#   'sus'        - stochastic universal sampling: evenly spaced pointers over the cumulative fitness
+import numpy as np
+from model import rng
+
+SELECTION_METHODS = ('tournament', 'rank', 'sus')
+
+
+# Indices into fitness of the selected parents, in the order they are paired for crossover
+def select_indices(fitness, num_parents, method='tournament', tournament_size=5, selection_pressure=1.5):
+    fitness = np.asarray(fitness, dtype=np.float64)
+    size = len(fitness)
+    generator = rng.generator
+    if num_parents <= 0 or size == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    if method == 'tournament':
+        competitors = generator.integers(0, size, size=(num_parents, max(1, min(tournament_size, size))))
+        winners = fitness[competitors].argmax(axis=1)
+        return competitors[np.arange(num_parents), winners]
+
+    if method == 'rank':
+        # rank 0 is the worst genome, ties keep their population order
+        ranks = np.empty(size, dtype=np.float64)
+        ranks[np.argsort(fitness, kind='stable')] = np.arange(size)
+        if size > 1:
+            weights = (2 - selection_pressure) / size + 2 * ranks * (selection_pressure - 1) / (size * (size - 1))
+        else:
+            weights = np.ones(1)
+        return roulette(weights, num_parents, generator)
+
+    if method == 'sus':
+        cumulative = np.cumsum(fitness)
+        step = cumulative[-1] / num_parents
+        pointers = generator.uniform(0, step) + step * np.arange(num_parents)
+        chosen = np.minimum(np.searchsorted(cumulative, pointers, side='right'), size - 1)
+        # pointers come out in population order, shuffle so neighbours don't always breed together
+        return generator.permutation(chosen)
+
+    raise ValueError(f"Unknown selection method: {method}")
+
+
+def roulette(weights, count, generator):
+    cumulative = np.cumsum(weights)
+    draws = generator.uniform(0, cumulative[-1], size=count)
+    return np.minimum(np.searchsorted(cumulative, draws, side='right'), len(weights) - 1)
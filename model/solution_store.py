@@ -0,0 +1,132 @@
+# Session scoped store for the best solutions of each browser session.
+# Records live in a shared cache (a diskcache.Cache in the Dash app), so every server worker and background run
+# sees the same data.  A session keeps its package table once and each solution as a few small arrays
+# (genes, truck mileage, delivery times, packed late flags) instead of a pickled genome.
+# The total size of all sessions is held under memory_budget bytes by evicting the least recently used sessions.
+import datetime
+import pickle
+from collections import OrderedDict
+import numpy as np
+from model.compact_genome import CompactGenome
+from model.package import PackageSpec
+from model.package_store import PackageStore
+from model.package_table import PackageTable
+
+INDEX_KEY = 'solution-store-index'
+
+
+def session_key(session_id):
+    return f'solutions-{session_id}'
+
+
+# Compact form of one best solution entry, see restore_solution
+def serialize_solution(entry):
+    genome = entry['genome']
+    return {
+        'generation': entry['generation'],
+        'total_cost': entry['total_cost'],
+        'island': entry.get('island'),
+        'genes': genome.genes.copy(),
+        'mileage': genome.mileage.copy(),
+        'delivery_times': genome.delivery_times.copy(),
+        'late_mask': np.packbits(genome.late_mask),
+        'total_miles': genome.total_miles,
+    }
+
+
+def restore_solution(data, table, truck_count, capacity, departure_time):
+    genome = CompactGenome(table, truck_count, capacity, data['genes'].copy(), departure_time)
+    genome.mileage = data['mileage'].copy()
+    genome.delivery_times = data['delivery_times'].copy()
+    genome.late_mask = np.unpackbits(data['late_mask'], count=len(table)).astype(bool)
+    genome.truck_dirty[:] = False
+    genome.total_miles = data['total_miles']
+    genome.late_packages = table.ids[genome.order[genome.late_mask]].tolist()
+    entry = {'generation': data['generation'], 'genome': genome, 'total_cost': data['total_cost']}
+    if data['island'] is not None:
+        entry['island'] = data['island']
+    return entry
+
+
+def serialize_table(table):
+    return {'ids': table.ids.copy(), 'address': table.address.copy(), 'due': table.due.copy()}
+
+
+def restore_table(data):
+    packages = PackageStore()
+    for pkg_id, address, due in zip(data['ids'].tolist(), data['address'].tolist(), data['due'].tolist()):
+        packages.insert(pkg_id, PackageSpec(pkg_id, address, datetime.timedelta(microseconds=due)))
+    return PackageTable(packages)
+
+
+class SolutionStore:
+    def __init__(self, cache, memory_budget=256 * 1024 * 1024):
+        self.cache = cache
+        self.memory_budget = memory_budget
+
+    # Replaces a session's solutions.  Solutions hold CompactGenomes sharing one table.
+    # Returns the number of solutions kept, older ones are dropped if the session alone exceeds the budget.
+    def save(self, session_id, env_hash, solutions):
+        if not solutions:
+            self.clear(session_id)
+            return 0
+        genome = solutions[0]['genome']
+        record = {
+            'env_hash': env_hash,
+            'table': serialize_table(genome.table),
+            'truck_count': genome.truck_count,
+            'capacity': genome.capacity,
+            'departure_time': genome.departure_time,
+            'solutions': [serialize_solution(entry) for entry in solutions],
+        }
+        blob = pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+        while len(blob) > self.memory_budget and len(record['solutions']) > 1:
+            # keep the newest (best) half
+            record['solutions'] = record['solutions'][len(record['solutions']) // 2:]
+            blob = pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+
+        with self.cache.transact():
+            index = self.cache.get(INDEX_KEY, OrderedDict())
+            index.pop(session_id, None)
+            index[session_id] = len(blob)
+            self.cache.set(session_key(session_id), blob)
+            total = sum(index.values())
+            while total > self.memory_budget and len(index) > 1:
+                evicted, size = index.popitem(last=False)
+                self.cache.delete(session_key(evicted))
+                total -= size
+            self.cache.set(INDEX_KEY, index)
+        return len(record['solutions'])
+
+    # Returns (env_hash, solutions) for a session, (None, []) if it has none or was evicted
+    def load(self, session_id):
+        blob = self.cache.get(session_key(session_id)) if session_id else None
+        if blob is None:
+            return None, []
+        self.touch(session_id)
+        record = pickle.loads(blob)
+        table = restore_table(record['table'])
+        solutions = [
+            restore_solution(data, table, record['truck_count'], record['capacity'], record['departure_time'])
+            for data in record['solutions']
+        ]
+        return record['env_hash'], solutions
+
+    # Marks a session as recently used
+    def touch(self, session_id):
+        with self.cache.transact():
+            index = self.cache.get(INDEX_KEY, OrderedDict())
+            if session_id in index:
+                index.move_to_end(session_id)
+                self.cache.set(INDEX_KEY, index)
+
+    def clear(self, session_id):
+        with self.cache.transact():
+            index = self.cache.get(INDEX_KEY, OrderedDict())
+            index.pop(session_id, None)
+            self.cache.delete(session_key(session_id))
+            self.cache.set(INDEX_KEY, index)
+
+    # Bytes held by all sessions
+    def size(self):
+        return sum(self.cache.get(INDEX_KEY, OrderedDict()).values())
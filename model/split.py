@@ -0,0 +1,123 @@
+# Optimal splitting of giant tours into trucks (Prins' "Split").
+# A giant tour genome only decides the order packages are delivered in, the truck loads are derived from it:
+# the tour is cut into consecutive runs of at most capacity packages, one run per truck, with the cuts that
+# minimise the usual cost (mileage including the drive back to the hub + $20 per late package + $20 per active
+# truck).  Every tour of the population is split in one lock step pass over the tour positions, keeping the
+# runs that can still end at the current position in a ring buffer of capacity columns.
+# Times are int64 microseconds like the array engine, so lateness matches NumpyFitness exactly.
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from model.costs import LATE_COST, TRUCK_COST
+
+
+# Running mileage and clock along each tour, plus what a truck starting at each position adds to them.
+# A run from i to k drives start_miles[i] + miles[k] + back_miles[k] and reaches k at start_clock[i] + clock[k].
+def tour_prefixes(engine, tours):
+    addresses = engine.pkg_address[tours]
+    steps = addresses[:, :-1], addresses[:, 1:]
+    miles = np.zeros(tours.shape, dtype=np.float64)
+    miles[:, 1:] = np.cumsum(engine.d_matrix[steps], axis=1)
+    clock = np.zeros(tours.shape, dtype=np.int64)
+    clock[:, 1:] = np.cumsum(engine.t_matrix[steps], axis=1)
+    start_miles = engine.d_matrix[0, addresses] - miles
+    start_clock = engine.departure_time + engine.t_matrix[0, addresses] - clock
+    back_miles = engine.d_matrix[addresses, 0]
+    return miles, clock, start_miles, start_clock, back_miles
+
+
+# Truck loads for every tour (rows of package keys), as a (tours, truck_count) array.
+# Tours whose best split needs more trucks than there are fall back to split_bounded.
+def split_tours(engine, tours, capacity, truck_count):
+    tours = np.asarray(tours, dtype=np.int64)
+    pop_size, n = tours.shape
+    width = max(1, min(capacity, n))
+    due = engine.pkg_due[tours]
+    miles, clock, start_miles, start_clock, back_miles = tour_prefixes(engine, tours)
+
+    # column c of the ring holds the run starting at the latest position i with i % width == c
+    ring_cost = np.full((pop_size, width), np.inf)
+    ring_clock = np.zeros((pop_size, width), dtype=np.int64)
+    ring_late = np.zeros((pop_size, width), dtype=np.int64)
+    ring_start = np.zeros(width, dtype=np.int64)
+    best = np.zeros((pop_size, n + 1))
+    cut = np.zeros((pop_size, n + 1), dtype=np.int64)
+    rows = np.arange(pop_size)
+
+    for k in range(n):
+        c = k % width
+        ring_cost[:, c] = best[:, k] + start_miles[:, k] + TRUCK_COST
+        ring_clock[:, c] = start_clock[:, k]
+        ring_late[:, c] = 0
+        ring_start[c] = k
+        # the package at k is late on every run whose clock gets there after it is due
+        ring_late += ring_clock > (due[:, k] - clock[:, k])[:, None]
+        candidates = ring_cost + (miles[:, k] + back_miles[:, k])[:, None] + LATE_COST * ring_late
+        choice = candidates.argmin(axis=1)
+        best[:, k + 1] = candidates[rows, choice]
+        cut[:, k + 1] = ring_start[choice]
+
+    loads = np.zeros((pop_size, truck_count), dtype=np.int64)
+    end = np.full(pop_size, n)
+    runs = []
+    while (end > 0).any():
+        start = np.where(end > 0, cut[rows, end], 0)
+        runs.append(end - start)
+        end = start
+    runs = np.array(runs[::-1]).T if runs else np.zeros((pop_size, 0), dtype=np.int64)
+    # runs are right aligned with leading zeros, the trucks are filled in tour order
+    for g in range(pop_size):
+        used = runs[g][runs[g] > 0]
+        if len(used) > truck_count:
+            used = split_bounded(engine, tours[g], capacity, truck_count)
+        loads[g, :len(used)] = used
+    return loads
+
+
+# Split of a single tour using at most truck_count trucks: one layer of the DP per truck, each layer a
+# (positions, capacity) array operation over the runs ending at every position that layer can reach.
+def split_bounded(engine, tour, capacity, truck_count):
+    n = len(tour)
+    width = max(1, min(capacity, n))
+    due = engine.pkg_due[tour]
+    miles, clock, start_miles, start_clock, back_miles = (p[0] for p in tour_prefixes(engine, tour[None, :]))
+
+    # run_cost[k, width - 1 - L] is the run of L + 1 packages ending at k.  It starts at k - L, so row k lines up
+    # with the window best[k - width + 1 .. k] of the prefixes it can follow.
+    run_cost = np.full((n, width), np.inf)
+    late = np.zeros(n, dtype=np.int64)
+    for length in range(width):
+        # late[i] counts the late packages of the run from i to i + length
+        late[:n - length] += start_clock[:n - length] + clock[length:] > due[length:]
+        run_cost[length:, width - 1 - length] = (start_miles[:n - length] + miles[length:] + back_miles[length:]
+                                                 + TRUCK_COST + LATE_COST * late[:n - length])
+
+    best = np.full(n + 1, np.inf)
+    best[0] = 0.0
+    layers = []
+    totals = []
+    for trucks in range(1, truck_count + 1):
+        # after this truck at least trucks and at most trucks * width packages are delivered, and the
+        # trucks left must still be able to take the rest
+        first = max(trucks, n - (truck_count - trucks) * width)
+        last = min(n, trucks * width)
+        choice = np.zeros(n, dtype=np.int64)
+        reached = np.full(n + 1, np.inf)
+        if first <= last:
+            prefixes = sliding_window_view(np.concatenate((np.full(width - 1, np.inf), best[:n])), width)
+            candidates = prefixes[first - 1:last] + run_cost[first - 1:last]
+            choice[first - 1:last] = candidates.argmin(axis=1)
+            reached[first:last + 1] = candidates[np.arange(last - first + 1), choice[first - 1:last]]
+        best = reached
+        layers.append(choice)
+        totals.append(best[n])
+
+    trucks = int(np.argmin(totals)) + 1
+    if not np.isfinite(totals[trucks - 1]):
+        raise ValueError(f"{n} packages do not fit {truck_count} trucks of capacity {capacity}")
+    loads = []
+    end = n
+    for layer in layers[:trucks][::-1]:
+        length = width - int(layer[end - 1])
+        loads.append(length)
+        end -= length
+    return np.array(loads[::-1], dtype=np.int64)
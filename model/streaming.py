@@ -0,0 +1,48 @@
+# Pieces for consuming a run a generation at a time, see genetic_algorithm_generations.
+# The generator yields a small GenerationSnapshot after every scored generation instead of printing genomes.
+#   - pause by not asking for the next snapshot, stop with close() (the run reports 'stopped')
+#   - when the run is driven from another thread, a RunControl pauses, resumes or stops it between generations
+#   - async_generations drives it from asyncio, one generation per executor call so the event loop stays free.
+#     Wrap it in contextlib.aclosing() to stop the run as soon as the loop is left early.
+import asyncio
+import threading
+from collections import namedtuple
+
+GenerationSnapshot = namedtuple('GenerationSnapshot', ['generation', 'best_cost', 'mean_cost', 'diversity', 'elapsed'])
+
+
+class RunControl:
+    def __init__(self):
+        self.running = threading.Event()
+        self.running.set()
+        self.stopped = False
+
+    def pause(self):
+        self.running.clear()
+
+    def resume(self):
+        self.running.set()
+
+    def stop(self):
+        self.stopped = True
+        self.running.set()
+
+    # Blocks while paused.  Returns False once the run should stop.
+    def wait(self):
+        self.running.wait()
+        return not self.stopped
+
+
+# Async iterator over a snapshot generator.  Each step runs in the default executor, leaving the generator
+# closed (and its run_info_out filled) however the consumer leaves the loop.
+async def async_generations(generations):
+    loop = asyncio.get_running_loop()
+    done = object()
+    try:
+        while True:
+            snapshot = await loop.run_in_executor(None, next, generations, done)
+            if snapshot is done:
+                break
+            yield snapshot
+    finally:
+        generations.close()
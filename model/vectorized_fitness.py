@@ -0,0 +1,260 @@
+# Vectorized NumPy fitness backend
+# Encodes a whole population as integer arrays and scores every genome at once.
+# Produces the same routes, mileage, late packages and costs as evaluate_fitness.
+import datetime
+import functools
+import numpy as np
+from model.routing import batched_nearest_neighbour
+from model.split import split_tours
+from model.metrics import timed
+from model.costs import LATE_COST, TRUCK_COST
+
+MICROSECOND = datetime.timedelta(microseconds=1)
+NEVER_DUE = np.iinfo(np.int64).max
+
+
+#timedeltas are exact integer microseconds, so keeping time as int64 microseconds
+#reproduces the per-stop rounding of the python path exactly
+def to_microseconds(value):
+    return value // MICROSECOND
+
+
+#One shared read-only array per time matrix.  get_matrices hands out the same tuple for a speed, so every
+#engine built on it after the first skips the conversion.  Lists aren't hashable and are converted every time.
+@functools.lru_cache(maxsize=32)
+def cached_microseconds(t_matrix):
+    array = np.array([[to_microseconds(t) for t in row] for row in t_matrix], dtype=np.int64)
+    array.setflags(write=False)
+    return array
+
+
+def time_matrix_to_microseconds(t_matrix):
+    if isinstance(t_matrix, tuple):
+        return cached_microseconds(t_matrix)
+    return np.array([[to_microseconds(t) for t in row] for row in t_matrix], dtype=np.int64)
+
+
+class NumpyFitness:
+    # pkg_address and pkg_due are indexed by package key and end with a padding entry at the hub
+    def __init__(self, pkg_address, pkg_due, matrices, departure_time=datetime.timedelta(hours=8)):
+        d_matrix, t_matrix = matrices
+        self.d_matrix = np.asarray(d_matrix, dtype=np.float64)
+        self.t_matrix = time_matrix_to_microseconds(t_matrix)
+        self.departure_time = to_microseconds(departure_time)
+        self.pkg_address = pkg_address
+        self.pkg_due = pkg_due
+        self.pad = len(pkg_address) - 1
+        #optional FitnessPool that scores route chunks in worker processes
+        self.pool = None
+        #optional RouteBuilder whose improvement pass runs after the nearest neighbour sort
+        self.route_builder = None
+        #optional RunMetrics (model/metrics.py) that times route sorting
+        self.metrics = None
+
+    # The pool holds worker processes and can't be pickled, workers get a copy of the engine without it
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['pool'] = None
+        state['metrics'] = None
+        return state
+
+    # Engine keyed by package id, for populations of Genome objects
+    @staticmethod
+    def from_packages(packages, matrices, departure_time=datetime.timedelta(hours=8)):
+        ids = packages.keys()
+        size = max(ids) + 2
+        pkg_address = np.zeros(size, dtype=np.int64)
+        pkg_due = np.full(size, NEVER_DUE, dtype=np.int64)
+        for pkg_id in ids:
+            pkg = packages.get(pkg_id)
+            pkg_address[pkg_id] = pkg.address
+            pkg_due[pkg_id] = to_microseconds(pkg.time_due)
+        return NumpyFitness(pkg_address, pkg_due, matrices, departure_time)
+
+    # Engine keyed by package table row, for populations of CompactGenome objects
+    @staticmethod
+    def from_table(table, matrices, departure_time=datetime.timedelta(hours=8)):
+        pkg_address = np.append(table.address, 0)
+        pkg_due = np.append(table.due, NEVER_DUE)
+        return NumpyFitness(pkg_address, pkg_due, matrices, departure_time)
+
+    # Packs truck routes into a (trucks, max route) array padded with the padding package id.
+    # Returns the routes and the route lengths.
+    def encode(self, trucks):
+        lengths = np.array([len(t.packages) for t in trucks], dtype=np.int64)
+        width = max(1, int(lengths.max()) if len(lengths) else 1)
+        flat = np.fromiter(
+            (pkg_id for t in trucks for pkg_id in t.packages),
+            dtype=np.int64,
+            count=int(lengths.sum())
+        )
+        rows = np.repeat(np.arange(len(lengths)), lengths)
+        starts = np.cumsum(lengths) - lengths
+        cols = np.arange(len(flat)) - np.repeat(starts, lengths)
+
+        routes = np.full((len(lengths), width), self.pad, dtype=np.int64)
+        routes[rows, cols] = flat
+        return routes, lengths
+
+    # Batched nearest neighbour, matches sort_truck_routes_by_location including tie breaks.
+    # An attached RouteBuilder with improvement passes then shortens each route.
+    def sort_routes(self, routes, lengths):
+        with timed(self.metrics, 'route_sorting'):
+            if self.route_builder is not None and self.route_builder.method == 'keep':
+                sorted_routes = routes.copy()
+            else:
+                sorted_routes = batched_nearest_neighbour(self.d_matrix, routes, self.pkg_address[routes], lengths)
+            if self.route_builder is not None and self.route_builder.max_passes:
+                lengths_list = lengths.tolist()
+                for r, length in enumerate(lengths_list):
+                    if length > 2:
+                        sorted_routes[r, :length] = self.route_builder.improve(sorted_routes[r, :length].tolist())
+        return sorted_routes
+
+    # Walks every route one stop at a time in lock step.  Additions happen in the same order as
+    # the python path so float mileage and integer arrival times are bit-for-bit identical.
+    def cost_routes(self, routes, lengths):
+        rows, width = routes.shape
+        addresses = self.pkg_address[routes]
+        mileage = np.zeros(rows, dtype=np.float64)
+        clock = np.full(rows, self.departure_time, dtype=np.int64)
+        arrival = np.zeros((rows, width), dtype=np.int64)
+        current = np.zeros(rows, dtype=np.int64)
+
+        for step in range(width):
+            active = step < lengths
+            nxt = np.where(active, addresses[:, step], current)
+            mileage += np.where(active, self.d_matrix[current, nxt], 0.0)
+            clock += np.where(active, self.t_matrix[current, nxt], 0)
+            arrival[:, step] = clock
+            current = nxt
+
+        #return to hub at the end of the day
+        mileage += self.d_matrix[current, 0]
+        clock += self.t_matrix[current, 0]
+        late = (arrival > self.pkg_due[routes]) & (np.arange(width)[None, :] < lengths[:, None])
+        return mileage, clock, arrival, late
+
+    # Sorts and costs a batch of routes, on the pool if one is attached.  Rows are independent so they can be
+    # split anywhere.  Returns (sorted routes, mileage, return time, arrival times, late mask).
+    def score_routes(self, routes, lengths):
+        if self.pool is not None and len(routes) >= self.pool.min_rows:
+            return self.pool.score_routes(routes, lengths)
+        sorted_routes = self.sort_routes(routes, lengths)
+        return (sorted_routes,) + self.cost_routes(sorted_routes, lengths)
+
+    # Scores the whole population.  Only trucks whose route changed since they were last scored go through
+    # the array engine, their sorted route, mileage and late packages are cached on the truck and every genome
+    # is then totalled from its trucks in the same order as evaluate_fitness.
+    # Delivery logs are left for evaluate_fitness to fill on the genomes that are displayed.
+    def evaluate(self, population):
+        dirty = [truck for genome in population for truck in genome.trucks if truck.dirty]
+        if dirty:
+            routes, lengths = self.encode(dirty)
+            sorted_routes, mileage, clock, _, late = self.score_routes(routes, lengths)
+            late_counts = late.sum(axis=1)
+            late_ids = sorted_routes[late].tolist()
+            late_starts = np.concatenate(([0], np.cumsum(late_counts))).tolist()
+            mileage = mileage.tolist()
+            clock = clock.tolist()
+            for r, truck in enumerate(dirty):
+                truck.packages = sorted_routes[r, :lengths[r]].tolist()
+                truck.mileage = mileage[r]
+                truck.time = datetime.timedelta(microseconds=clock[r])
+                truck.late_packages = late_ids[late_starts[r]:late_starts[r + 1]]
+                truck.dirty = False
+
+        fitness_scores = []
+        for genome in population:
+            genome.late_packages = []
+            active_trucks = 0
+            genome.total_miles = 0
+            for truck in genome.trucks:
+                genome.late_packages.extend(truck.late_packages)
+                if truck.packages:
+                    active_trucks += 1
+                    genome.total_miles += truck.mileage
+            total_cost = genome.total_miles + len(genome.late_packages) * LATE_COST + active_trucks * TRUCK_COST
+            fitness_scores.append((genome, 1.0 / (total_cost + 1), total_cost))
+
+        fitness_scores.sort(key=lambda x: x[1], reverse=True)
+        return fitness_scores
+
+    # Compact genomes already are arrays: the routes of dirty trucks are cut straight out of the stacked genes,
+    # scored, and merged with the cached results of the clean trucks.  Sorted order, per truck mileage and per
+    # package delivery times and lateness are written back as arrays.
+    def evaluate_compact(self, population):
+        pop_size = len(population)
+        n = population[0].package_count
+        truck_count = population[0].truck_count
+        genes = np.stack([g.genes for g in population]).astype(np.int64)
+        loads = genes[:, n:]
+        flat_loads = loads.reshape(-1)
+        order = genes[:, :n].reshape(-1)
+        mileage = np.stack([g.mileage for g in population]).reshape(-1)
+        delivery_times = np.stack([g.delivery_times for g in population]).reshape(-1)
+        late = np.stack([g.late_mask for g in population]).reshape(-1)
+        truck_dirty = np.stack([g.truck_dirty for g in population]).reshape(-1)
+
+        route_rows = np.repeat(np.arange(pop_size * truck_count), flat_loads)
+        starts = np.cumsum(flat_loads) - flat_loads
+        cols = np.arange(pop_size * n) - np.repeat(starts, flat_loads)
+
+        dirty_rows = np.nonzero(truck_dirty)[0]
+        if len(dirty_rows):
+            dirty_positions = truck_dirty[route_rows]
+            compact_row = np.full(pop_size * truck_count, -1, dtype=np.int64)
+            compact_row[dirty_rows] = np.arange(len(dirty_rows))
+            rows = compact_row[route_rows[dirty_positions]]
+            dirty_cols = cols[dirty_positions]
+
+            dirty_lengths = flat_loads[dirty_rows]
+            routes = np.full((len(dirty_rows), max(1, int(dirty_lengths.max()))), self.pad, dtype=np.int64)
+            routes[rows, dirty_cols] = order[dirty_positions]
+            sorted_routes, dirty_mileage, _, arrival, dirty_late = self.score_routes(routes, dirty_lengths)
+
+            order[dirty_positions] = sorted_routes[rows, dirty_cols]
+            delivery_times[dirty_positions] = arrival[rows, dirty_cols]
+            late[dirty_positions] = dirty_late[rows, dirty_cols]
+            mileage[dirty_rows] = dirty_mileage
+
+        order = order.reshape(pop_size, n)
+        delivery_times = delivery_times.reshape(pop_size, n)
+        late = late.reshape(pop_size, n)
+        mileage = mileage.reshape(pop_size, truck_count)
+        active = loads > 0
+
+        total_miles = np.zeros(pop_size, dtype=np.float64)
+        for t in range(truck_count):
+            total_miles += np.where(active[:, t], mileage[:, t], 0.0)
+        total_cost = total_miles + late.sum(axis=1) * LATE_COST + active.sum(axis=1) * TRUCK_COST
+        fitness = 1.0 / (total_cost + 1)
+
+        fitness_scores = []
+        for g, genome in enumerate(population):
+            genome.order[:] = order[g]
+            genome.mileage[:] = mileage[g]
+            genome.delivery_times[:] = delivery_times[g]
+            genome.late_mask[:] = late[g]
+            genome.truck_dirty[:] = False
+            genome.late_packages = genome.table.ids[order[g][late[g]]].tolist()
+            genome.total_miles = float(total_miles[g])
+            fitness_scores.append((genome, float(fitness[g]), float(total_cost[g])))
+
+        fitness_scores.sort(key=lambda x: x[1], reverse=True)
+        return fitness_scores
+
+    # Giant tour genomes: each genome's order is split into its cost-optimal truck loads (model/split.py) before
+    # scoring.  Trucks whose span of the tour moved are re-scored, the rest keep their cached results.
+    # With a 'keep' route builder the tour order is delivered as is, so the split's costs are the real ones,
+    # otherwise the routes are sorted as usual and written back as the genome's new tour.
+    def evaluate_giant(self, population):
+        genome = population[0]
+        tours = np.stack([g.order for g in population])
+        loads = split_tours(self, tours, genome.capacity, genome.truck_count)
+        for g, genome in enumerate(population):
+            old_starts, old_ends = genome.truck_bounds()
+            genome.loads[:] = loads[g]
+            new_starts, new_ends = genome.truck_bounds()
+            genome.truck_dirty |= (old_starts != new_starts) | (old_ends != new_ends)
+        return self.evaluate_compact(population)
@@ -8,6 +8,10 @@ class Vehicle:
         self.address = address
         self.depart_time = departure_time
         self.time = departure_time
+        #cached route results, only recalculated by evaluate_fitness when the route has changed
+        self.delivery_log = []
+        self.late_packages = []
+        self.dirty = True
 
     def __str__(self):
         return print (f'{self.capacity}, {self.speed}, {self.packages}, {self.mileage}, {self.address}, {self.depart_time}')
\ No newline at end of file